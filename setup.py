@@ -14,7 +14,8 @@ setup(
     py_modules=['sim'],
     long_description=read('README.md'),
     long_description_content_type='text/markdown',
-    python_requires='>=3.5',
-    install_requires=['numpy',
-                      'pybullet>=2.6.6']
+    python_requires='>=3.8',
+    install_requires=['numpy>=1.17',
+                      'pybullet>=2.6.6',
+                      'pyyaml']
 )
\ No newline at end of file
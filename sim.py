@@ -1,6 +1,18 @@
+import os
+import copy
+import pickle
+import numbers
+import collections
 import time
+import queue
+import itertools
+import threading
+import traceback
 import multiprocessing
+import numpy as np
 from simulator.game import Game
+from simulator.camera import CameraConfig
+from simulator.frame_ring import FrameRing
 
 # Constants
 SRRESET = 0
@@ -11,6 +23,38 @@ SRIMAGE = 4
 SRPOSE = 5
 SRWHEELS = 6
 SRENABLED = 7
+SRACT = 8
+SRSTEREO = 9
+SRSNAPSHOT = 10
+SRREWIND = 11
+
+# Operations of SRSNAPSHOT, named after the Game methods they call
+SNAPSHOT_OPS = ("save", "restore", "list", "evict")
+
+# The reply to SRACT, everything a control tick needs in one round trip.
+# wheel_vels is (left, right) like read_robot_vels()
+Observation = collections.namedtuple("Observation",
+                                     ["pose", "wheel_vels", "time", "enabled", "image"])
+
+# A robot camera frame, its sequence number, and the sim time it shows
+CameraFrame = collections.namedtuple("CameraFrame", ["image", "seq", "time"])
+
+# A synchronized pair from the left and right robot cameras, the depth
+# in meters is None unless it was asked for
+StereoFrame = collections.namedtuple("StereoFrame",
+                                     ["left", "right", "left_depth", "right_depth", "time"])
+
+class _ServerError:
+    """Carries an exception raised while handling a request back to the
+    client, which raises it again.
+    """
+    def __init__(self, error):
+        try:
+            pickle.dumps(error)
+        except Exception:
+            # Keep what went wrong even when the exception can't be sent
+            error = RuntimeError(repr(error))
+        self.error = error
 
 class SimConfig:
     def __init__(self, bin_configuration_yaml):
@@ -30,9 +74,30 @@ class SimConfig:
         self.auto_enable_timer = 0.0
         self.skew = 0.0
 
+        # Each server logs into its own sim_<pid> subdirectory of log_dir,
+        # so servers sharing a config don't write over each other's logs
         self.log_dir = None
         self.log_bullet_states = False
         self.log_mp4 = False
+        # Frames per simulated second of headless .mp4 logs
+        self.video_fps = 30.0
+        # Record the robot's trajectory every step to telemetry.npy
+        self.log_telemetry = False
+
+        # Resolution, lens and renderer of the robot camera
+        self.camera_config = CameraConfig()
+        # Number of camera frames a client can hold before they are reused,
+        # a stereo capture takes two of them, or four with depth
+        self.camera_ring_size = 8
+
+        # Number of named snapshots a server keeps before evicting the
+        # least recently used
+        self.max_snapshots = 64
+
+        # Sim seconds between the states kept for rewind(), 0 disables it,
+        # and how many of them to keep
+        self.rewind_interval = 0.0
+        self.rewind_capacity = 120
 
     def validate(self):
         """Validate the current configurations for
@@ -44,111 +109,678 @@ class SimConfig:
 
 # ----------- Sim Server Side -----------
 
-def _sim_server(q, s, sim_config):
+def _server_log_dir(sim_config, pid):
+    """The directory the server with the given pid logs into, None if it doesn't log."""
+    if not sim_config.log_dir:
+        return None
+    return os.path.join(sim_config.log_dir, "sim_{}".format(pid))
+
+def _make_game(sim_config):
+    """Creates and sets up a Game as described by the config.
+    Call it in the server process, whose pid names the log subdirectory.
+    """
     g = Game(use_interactive=sim_config.use_interactive,
              is_interactive_realtime=sim_config.is_interactive_realtime,
              hide_ui=sim_config.hide_ui,
              topdown_viewport=sim_config.topdown_viewport,
-             log_dir=sim_config.log_dir,
+             log_dir=_server_log_dir(sim_config, os.getpid()),
              log_bullet_states=sim_config.log_bullet_states,
              log_mp4=sim_config.log_mp4,
-             robot_skew=sim_config.skew)
+             log_telemetry=sim_config.log_telemetry,
+             robot_skew=sim_config.skew,
+             camera_config=sim_config.camera_config,
+             max_snapshots=sim_config.max_snapshots,
+             rewind_interval=sim_config.rewind_interval,
+             rewind_capacity=sim_config.rewind_capacity,
+             video_fps=sim_config.video_fps)
     g.setup(bin_configuration_yaml=sim_config.bin_configuration_yaml,
             starting_state_fname=sim_config.starting_state_fname,
             starting_robot_pose=sim_config.starting_robot_pose,
             starting_time=sim_config.starting_time,
             auto_enable_timer=sim_config.auto_enable_timer)
+    return g
+
+def _capture_frame(g, frames):
+    """Reads the robot camera into the next slot of the frame ring.
+
+    :return: a CameraFrame holding the slot index instead of the pixels.
+    """
+    slot, _ = frames.next_slot()
+    g.read_camera(out=frames.frames[slot])
+    return CameraFrame(slot, g.camera_frame_seq, g.camera_frame_time)
+
+def _capture_stereo(g, frames, depth):
+    """Renders both robot cameras into the next slots of the frame ring.
+    Depth maps take a slot each, they are as large as an RGBA frame.
+
+    :return: a StereoFrame holding slot indices instead of the pixels.
+    """
+    camera = g.mobile_agent.camera
+    slots = [frames.next_slot()[0] for _ in range(4 if depth else 2)]
+    out = (frames.frames[slots[0]], frames.frames[slots[1]])
+    depth_out = None
+    if depth:
+        depth_out = (frames.view(slots[2], (camera.height, camera.width), np.float32),
+                     frames.view(slots[3], (camera.height, camera.width), np.float32))
+    g.mobile_agent.capture_stereo(out=out, depth=depth, depth_out=depth_out)
+    if not depth:
+        slots += [None, None]
+    return StereoFrame(*slots, g.time)
+
+def _snapshot(g, op, name=None):
+    """Runs one of the SNAPSHOT_OPS on the game."""
+    if op not in SNAPSHOT_OPS:
+        raise ValueError("unknown snapshot operation {}".format(op))
+    if op == "list":
+        return g.list_snapshots()
+    return getattr(g, op + "_snapshot")(name)
+
+def _observe(g, with_image=False, frames=None):
+    """Packs the state a controller reads every tick into an Observation.
+    The image is sent through the frame ring when there is one.
+    """
+    if not with_image:
+        image = None
+    elif frames is None:
+        image = g.mobile_agent.capture_image()
+    else:
+        image = _capture_frame(g, frames)
+    return Observation(pose=g.mobile_agent.get_pose(),
+                       wheel_vels=g.mobile_agent.read_wheel_velocities(),
+                       time=g.time,
+                       enabled=g.mobile_agent.enabled,
+                       image=image)
+
+def _act(g, lwheel_vel, rwheel_vel, num_steps, with_image, frames=None):
+    """Commands the wheels, runs the steps, then observes the result."""
+    # Same order as SRWHEELS, the agent's first wheel is the physical left one
+    g.mobile_agent.command_wheel_velocities(lwheel_vel, rwheel_vel)
+    for _ in range(num_steps):
+        g.step()
+    return _observe(g, with_image, frames)
+
+def _parse_step(req_token):
+    """Unpacks a (SRSTEP, num_steps[, wait, observe]) request.
+    The older (SRSTEP, num_steps) form neither waits nor observes.
+
+    :return: the (num_steps, wait, observe) of the request.
+    :raises ValueError: if the request is malformed or the step count
+                        isn't a non-negative integer.
+    """
+    if len(req_token) == 2:
+        _, num_steps = req_token
+        wait, observe = False, False
+    elif len(req_token) == 4:
+        _, num_steps, wait, observe = req_token
+    else:
+        raise ValueError("malformed step request {}".format(req_token))
+    if not isinstance(num_steps, numbers.Integral) or isinstance(num_steps, bool) or num_steps < 0:
+        raise ValueError("num_steps must be a non-negative integer, got {!r}".format(num_steps))
+    return int(num_steps), wait, observe
+
+def _handle_request(g, frames, req_token):
+    """Handles any request but stepping and ending.
+
+    :return: the reply to the request.
+    :raises ValueError: if the request is unknown.
+    """
+    if type(req_token) is tuple:
+        if req_token[0] == SRTIME:
+            g.time = req_token[1]
+            return g.time
+        elif req_token[0] == SRPOSE:
+            return g.mobile_agent.set_pose(req_token[1])
+        elif req_token[0] == SRWHEELS:
+            return g.mobile_agent.command_wheel_velocities(req_token[1], req_token[2])
+        elif req_token[0] == SRENABLED:
+            g.mobile_agent.enabled = req_token[1]
+            return g.mobile_agent.enabled
+        elif req_token[0] == SRACT:
+            return _act(g, *req_token[1:], frames=frames)
+        elif req_token[0] == SRSTEREO:
+            return _capture_stereo(g, frames, req_token[1])
+        elif req_token[0] == SRREWIND:
+            return g.rewind(req_token[1])
+        elif req_token[0] == SRSNAPSHOT:
+            return _snapshot(g, *req_token[1:])
+    elif req_token == SRRESET:
+        return g.reset()
+    elif req_token == SRTIME:
+        return g.time
+    elif req_token == SRIMAGE:
+        return _capture_frame(g, frames)
+    elif req_token == SRPOSE:
+        return g.mobile_agent.get_pose()
+    elif req_token == SRWHEELS:
+        return g.mobile_agent.read_wheel_velocities()
+    elif req_token == SRENABLED:
+        return g.mobile_agent.enabled
+    raise ValueError("unknown request {}".format(req_token))
+
+def _sim_server(q, s, sim_config, frame_ring_name):
+    g = _make_game(sim_config)
+    frames = FrameRing(sim_config.camera_ring_size, sim_config.camera_config.frame_shape,
+                       name=frame_ring_name)
 
     uncompleted_steps = 0
+    # Step requests that only get their reply once stepping is done,
+    # stored as (req_id, observe) pairs
+    step_waiters = []
+    # A step error nobody was waiting for, raised by the next request
+    step_error = None
     while True:
         if sim_config.is_interactive_realtime or uncompleted_steps > 0:
-            g.step()
+            try:
+                g.step()
+            except Exception as e:
+                if step_error is None:
+                    traceback.print_exc()
+                # Stop stepping, and let the waiting requests know why
+                for waiter_id, _ in step_waiters:
+                    s.put((waiter_id, _ServerError(e)))
+                if not step_waiters:
+                    step_error = e
+                step_waiters = []
+                uncompleted_steps = 0
             uncompleted_steps -= 1 if uncompleted_steps > 0 else 0
-        if q.empty(): continue
-
-        req_token = q.get()
-        if type(req_token) is tuple:
-            if req_token[0] == SRSTEP:
-                uncompleted_steps = req_token[1]
-                s.put(True)
-            elif req_token[0] == SRTIME:
-                g.time = req_token[1]
-                s.put(g.time)
-            elif req_token[0] == SRPOSE:
-                s.put(g.mobile_agent.set_pose(req_token[1]))
-            elif req_token[0] == SRWHEELS:
-                s.put(g.mobile_agent.command_wheel_velocities(req_token[1], req_token[2]))
-            elif req_token[0] == SRENABLED:
-                g.mobile_agent.enabled = req_token[1]
-                s.put(g.mobile_agent.enabled)
-        elif req_token == SRRESET:
-            s.put(g.reset())
+        if uncompleted_steps == 0 and step_waiters:
+            for waiter_id, observe in step_waiters:
+                s.put((waiter_id, _observe(g) if observe else g.time))
+            step_waiters = []
+
+        # Only poll while there are physics steps left to run, otherwise
+        # sleep on the queue until the client asks for something
+        try:
+            if uncompleted_steps > 0:
+                req_id, req_token = q.get_nowait()
+            elif sim_config.is_interactive_realtime:
+                req_id, req_token = q.get(timeout=g.TIMESTEPPING_DT)
+            else:
+                req_id, req_token = q.get()
+        except queue.Empty:
+            continue
+
+        if step_error is not None and req_token != SREND:
+            s.put((req_id, _ServerError(step_error)))
+            step_error = None
+        elif type(req_token) is tuple and req_token[0] == SRSTEP:
+            try:
+                num_steps, wait, observe = _parse_step(req_token)
+            except Exception as e:
+                s.put((req_id, _ServerError(e)))
+                continue
+            uncompleted_steps = num_steps
+            if not (wait or observe):
+                s.put((req_id, True))
+            elif uncompleted_steps > 0:
+                step_waiters.append((req_id, observe))
+            else:
+                s.put((req_id, _observe(g) if observe else g.time))
         elif req_token == SREND:
-            s.put(True)
+            g.close()
+            frames.close()
+            s.put((req_id, True))
+            # Lets the client's response reader exit
+            s.put(None)
             break
-        elif req_token == SRTIME:
-            s.put(g.time)
-        elif req_token == SRIMAGE:
-            s.put(g.mobile_agent.capture_image())
-        elif req_token == SRPOSE:
-            s.put(g.mobile_agent.get_pose())
-        elif req_token == SRWHEELS:
-            s.put(g.mobile_agent.read_wheel_velocities())
-        elif req_token == SRENABLED:
-            s.put(g.mobile_agent.enabled)
         else:
-            print("simserver, something new came: ", req_token)
+            # A failing request shouldn't bring the server down, the
+            # client raises the error instead
+            try:
+                s.put((req_id, _handle_request(g, frames, req_token)))
+            except Exception as e:
+                s.put((req_id, _ServerError(e)))
+
+def _sim_pool_worker(conn, sim_config):
+    """Lock-step server behind SimPool, replies only once stepping is done."""
+    g = _make_game(sim_config)
+
+    while True:
+        req_token = conn.recv()
+        if req_token[0] == SREND:
+            g.close()
+            conn.send(True)
+            break
+        # Like the sim server, errors are sent back instead of ending the worker
+        try:
+            if req_token[0] == SRACT:
+                conn.send(_act(g, *req_token[1:]))
+            elif req_token[0] == SRRESET:
+                g.reset()
+                conn.send(_observe(g))
+            elif req_token[0] == SRSNAPSHOT:
+                _snapshot(g, *req_token[1:])
+                conn.send(_observe(g))
+            else:
+                raise ValueError("unknown request {}".format(req_token))
+        except Exception as e:
+            conn.send(_ServerError(e))
 
 # ------------- Client Side -------------
-req_queue = multiprocessing.Queue()
-res_queue = multiprocessing.Queue()
 
-def request(value):
-    while not req_queue.empty(): pass
-    while not res_queue.empty(): pass
-    req_queue.put(value)
-    while res_queue.empty(): pass
-    return res_queue.get()
+class SimHandle:
+    """Client side of one sim server.
+
+    Owns the request/response queues and the process running the
+    server, so a single client can drive several simulators side by
+    side. Every request is tagged with a unique id, and a reader thread
+    hands each response to the waiter registered under the same id.
+    """
+    # Seconds between checks that the server is still alive
+    SERVER_POLL_INTERVAL = 0.5
+
+    def __init__(self, config):
+        self.config = config
+        self.req_queue = multiprocessing.Queue()
+        self.res_queue = multiprocessing.Queue()
+        self.frames = FrameRing(config.camera_ring_size, config.camera_config.frame_shape)
+        self.process = multiprocessing.Process(target=_sim_server,
+                                               args=(self.req_queue, self.res_queue,
+                                                     config, self.frames.name))
+
+        self._req_ids = itertools.count()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # Why requests can't be answered anymore, once the server is gone
+        self._failure = None
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+
+    def start(self):
+        """Launches the sim server process and the response reader."""
+        self.process.start()
+        self._reader.start()
+        return self
+
+    @property
+    def log_dir(self):
+        """The directory this server logs into, once it has started."""
+        return _server_log_dir(self.config, self.process.pid)
+
+    def _read_responses(self):
+        """Dispatches responses from the sim server to their waiting requests.
+        Runs in a daemon thread until the server shuts down or dies, then
+        fails every request still waiting.
+        """
+        while True:
+            try:
+                response = self.res_queue.get(timeout=self.SERVER_POLL_INTERVAL)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                failure = RuntimeError("sim server exited with code {}".format(self.process.exitcode))
+                break
+            if response is None:
+                failure = RuntimeError("sim server has ended")
+                break
+            req_id, value = response
+            with self._pending_lock:
+                waiter = self._pending.pop(req_id, None)
+            # The waiter is gone if its request already timed out
+            if waiter is not None:
+                waiter[1] = value
+                waiter[0].set()
+
+        with self._pending_lock:
+            self._failure = failure
+            waiters = list(self._pending.values())
+            self._pending.clear()
+        for waiter in waiters:
+            waiter[1] = _ServerError(failure)
+            waiter[0].set()
+
+    def request(self, value, timeout=None):
+        """Sends a request to the sim server and waits for its response.
+        Safe to call from multiple threads at once.
+
+        :param value:   the request token, optionally with arguments as a tuple.
+        :param timeout: seconds to wait for the response, None waits forever.
+        :raises TimeoutError: if the response did not arrive in time.
+        :raises RuntimeError: if the sim server is no longer running.
+        :raises Exception:    whatever handling the request raised in the server,
+                              or a step that failed in the background since
+                              the last request, instead of its response.
+        """
+        req_id = next(self._req_ids)
+        waiter = [threading.Event(), None]
+        with self._pending_lock:
+            if self._failure is not None:
+                raise self._failure
+            self._pending[req_id] = waiter
+        self.req_queue.put((req_id, value))
+        if not waiter[0].wait(timeout):
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+            raise TimeoutError("sim server did not respond to {} in {} sec".format(value, timeout))
+        if isinstance(waiter[1], _ServerError):
+            raise waiter[1].error
+        return waiter[1]
+
+    def restart(self, timeout=None):
+        return self.request(SRRESET, timeout)
+
+    def end(self, timeout=None):
+        ended = self.request(SREND, timeout)
+        self.process.join(timeout)
+        self.frames.close()
+        return ended
+
+    def step(self, num_steps=1, wait=False, observe=False, timeout=None):
+        """Advances the simulation.
+
+        By default the server replies right away and runs the steps in
+        the background. With `wait` the reply only comes once the steps
+        are done, so lock-step controllers need not poll `get_time()`.
+        A newer step request replaces the remaining count, and every
+        waiting request is answered once that count runs out.
+
+        :param num_steps: the number of physics steps to advance.
+        :param wait:      reply with the sim time once the steps are done.
+        :param observe:   reply with an Observation once the steps are done.
+        :param timeout:   seconds to wait for the response.
+        :return:          True, the sim time, or an Observation.
+        """
+        return self.request((SRSTEP, num_steps, wait, observe), timeout)
+
+    def get_time(self, timeout=None):
+        return self.request(SRTIME, timeout)
+
+    def set_time(self, time, timeout=None):
+        return self.request((SRTIME, time), timeout)
+
+    def read_robot_cam(self, timeout=None):
+        return self.read_robot_cam_frame(timeout).image
+
+    def read_robot_cam_frame(self, timeout=None):
+        """Captures the robot camera.
+
+        The pixels never pass through the queues, the image is a view
+        into shared memory that stays valid for the next
+        `camera_ring_size - 1` captures. Copy it to keep it longer.
+
+        :param timeout: seconds to wait for the response.
+        :return:        a CameraFrame of the image, its sequence number,
+                        and the sim time it was rendered at. With a camera
+                        frame rate, the latest frame is returned and the
+                        sequence number tells whether it is a new one.
+        """
+        return self._unpack_frame(self.request(SRIMAGE, timeout))
+
+    def _unpack_frame(self, frame):
+        """Swaps the slot index sent by the server for the pixels."""
+        return frame._replace(image=self.frames.frames[frame.image])
+
+    def read_robot_stereo(self, depth=False, timeout=None):
+        """Captures both robot cameras as one synchronized pair.
+
+        Like `read_robot_cam_frame()`, the images are views into shared
+        memory. The pair takes two slots of the ring, or four with depth.
+
+        :param depth:   whether to also capture the depth in meters.
+        :param timeout: seconds to wait for the response.
+        :return:        a StereoFrame of both images, their depth maps,
+                        and the sim time they were captured at.
+        """
+        stereo = self.request((SRSTEREO, depth), timeout)
+        depth_shape = self.config.camera_config.frame_shape[:2]
+        return stereo._replace(
+            left=self.frames.frames[stereo.left],
+            right=self.frames.frames[stereo.right],
+            left_depth=self.frames.view(stereo.left_depth, depth_shape, np.float32) if depth else None,
+            right_depth=self.frames.view(stereo.right_depth, depth_shape, np.float32) if depth else None)
+
+    def get_robot_pose(self, timeout=None):
+        return self.request(SRPOSE, timeout)
+
+    def set_robot_pose(self, pose, timeout=None):
+        return self.request((SRPOSE, pose), timeout)
+
+    def read_robot_vels(self, timeout=None):
+        return self.request(SRWHEELS, timeout)
+
+    def command_robot_vels(self, lwheel_vel, rwheel_vel, timeout=None):
+        return self.request((SRWHEELS, lwheel_vel, rwheel_vel), timeout)
+
+    def get_enabled(self, timeout=None):
+        return self.request(SRENABLED, timeout)
+
+    def set_enabled(self, enabled, timeout=None):
+        return self.request((SRENABLED, enabled), timeout)
+
+    def save_snapshot(self, name, timeout=None):
+        """Saves the sim state in the server's memory under a name.
+
+        :param name:    the name of the snapshot, an existing one is replaced.
+        :param timeout: seconds to wait for the response.
+        :return:        the sim time of the snapshot.
+        """
+        return self.request((SRSNAPSHOT, "save", name), timeout)
+
+    def restore_snapshot(self, name, timeout=None):
+        """Returns the sim to a snapshot saved with `save_snapshot()`.
+
+        :param name:    the name of the snapshot.
+        :param timeout: seconds to wait for the response.
+        :return:        the sim time after restoring.
+        :raises KeyError: if there is no such snapshot.
+        """
+        return self.request((SRSNAPSHOT, "restore", name), timeout)
+
+    def list_snapshots(self, timeout=None):
+        return self.request((SRSNAPSHOT, "list"), timeout)
+
+    def evict_snapshot(self, name, timeout=None):
+        return self.request((SRSNAPSHOT, "evict", name), timeout)
+
+    def rewind(self, seconds, timeout=None):
+        """Jumps the sim back in time, see `Game.rewind()`.
+        Needs `rewind_interval` set in the SimConfig.
+
+        :param seconds: how far back to go in sim seconds.
+        :param timeout: seconds to wait for the response.
+        :return:        the sim time after rewinding, None when nothing
+                        has been kept to rewind to.
+        """
+        return self.request((SRREWIND, seconds), timeout)
+
+    def act(self, lwheel_vel, rwheel_vel, num_steps=1, with_image=False, timeout=None):
+        """Commands the wheels, steps, and observes in one round trip.
+
+        :param lwheel_vel: the left wheel velocity to command.
+        :param rwheel_vel: the right wheel velocity to command.
+        :param num_steps:  the number of physics steps to advance.
+        :param with_image: whether to also capture the robot camera.
+        :param timeout:    seconds to wait for the response.
+        :return:           the Observation once the steps are done, its
+                           wheel_vels are (left, right).
+        """
+        observation = self.request((SRACT, lwheel_vel, rwheel_vel, num_steps, with_image), timeout)
+        if with_image:
+            observation = observation._replace(image=self._unpack_frame(observation.image).image)
+        return observation
+
+class SimPool:
+    """A batch of headless sim servers stepped in lock-step.
+
+    Each worker process runs its own `Game(use_interactive=False)`, so
+    throughput scales with the number of cores. Commands go out to every
+    worker before any result is awaited, and results come back stacked
+    into NumPy arrays with one row per sim.
+    """
+    def __init__(self, num_sims, config):
+        """Launches the workers.
+
+        :param num_sims: the number of sims to run side by side.
+        :param config:   the SimConfig shared by every sim, it is always
+                         run headless with manual timestepping.
+        """
+        headless_config = copy.copy(config)
+        headless_config.use_interactive = False
+        headless_config.is_interactive_realtime = False
+        headless_config.hide_ui = True
+        self.config = headless_config
+
+        self.conns = []
+        self.processes = []
+        for _ in range(num_sims):
+            conn, worker_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_sim_pool_worker,
+                                              args=(worker_conn, headless_config))
+            process.start()
+            self.conns.append(conn)
+            self.processes.append(process)
+
+    def __len__(self):
+        return len(self.conns)
+
+    @property
+    def log_dirs(self):
+        """The directory each sim logs into, in the order of the rows."""
+        return [_server_log_dir(self.config, process.pid) for process in self.processes]
+
+    def _gather(self, commands):
+        """Sends one command per worker, then collects every observation.
+
+        :return: stacked (poses, wheel velocities, times) arrays of shape
+                 (n, 3), (n, 2) and (n,). The wheel velocity columns are
+                 left then right, like the actions of `step()`.
+        :raises Exception: the first error raised by a worker.
+        """
+        for conn, command in zip(self.conns, commands):
+            conn.send(command)
+        # Every worker replies, so the pool stays in lock-step even on errors
+        observations = [conn.recv() for conn in self.conns]
+        for o in observations:
+            if isinstance(o, _ServerError):
+                raise o.error
+        return (np.array([o.pose for o in observations]),
+                np.array([o.wheel_vels for o in observations]),
+                np.array([o.time for o in observations]))
+
+    def step(self, actions, num_steps=1):
+        """Commands the wheels of every sim, then advances them all.
+
+        :param actions:   (n, 2) wheel velocities, one row per sim with the
+                          left wheel in column 0 and the right in column 1.
+        :param num_steps: the number of physics steps to advance.
+        :return:          the stacked observations after stepping, with the
+                          wheel velocities in the same left, right columns.
+        """
+        actions = np.asarray(actions, dtype=float).reshape(len(self), 2)
+        return self._gather([(SRACT, l, r, num_steps, False) for l, r in actions])
+
+    def reset(self):
+        """Resets every sim to its starting state.
+
+        :return: the stacked observations after resetting.
+        """
+        return self._gather([(SRRESET,)] * len(self))
+
+    def save_snapshot(self, name):
+        """Saves the current state of every sim under a name.
+
+        :param name: the name of the snapshot.
+        :return:     the stacked observations at the snapshot.
+        """
+        return self._gather([(SRSNAPSHOT, "save", name)] * len(self))
+
+    def restore_snapshot(self, name):
+        """Branches every sim off a snapshot saved with `save_snapshot()`.
+
+        :param name: the name of the snapshot.
+        :return:     the stacked observations after restoring.
+        """
+        return self._gather([(SRSNAPSHOT, "restore", name)] * len(self))
+
+    def close(self):
+        """Shuts down every worker."""
+        for conn in self.conns:
+            conn.send((SREND,))
+        for conn, process in zip(self.conns, self.processes):
+            conn.recv()
+            process.join()
+
+# The module level functions drive the most recently started sim
+_default_handle = None
+
+def _handle():
+    if _default_handle is None:
+        raise RuntimeError("no sim server running, call start(config) first")
+    return _default_handle
+
+def request(value, timeout=None):
+    return _handle().request(value, timeout)
 
 def start(config):
-    p = multiprocessing.Process(target=_sim_server, args=(req_queue, res_queue, config))
-    p.start()
+    """Launches a sim server for the given config.
+    The returned handle drives that server independently of any other,
+    while the module level functions drive the most recent one.
+
+    :param config: the SimConfig for the server.
+    :return:       the SimHandle of the new server.
+    """
+    global _default_handle
+    _default_handle = SimHandle(config).start()
+    return _default_handle
+
+def restart(timeout=None):
+    return _handle().restart(timeout)
+
+def end(timeout=None):
+    return _handle().end(timeout)
+
+def step(num_steps=1, wait=False, observe=False, timeout=None):
+    return _handle().step(num_steps, wait, observe, timeout)
+
+def get_time(timeout=None):
+    return _handle().get_time(timeout)
+
+def set_time(time, timeout=None):
+    return _handle().set_time(time, timeout)
+
+def read_robot_cam(timeout=None):
+    return _handle().read_robot_cam(timeout)
+
+def read_robot_cam_frame(timeout=None):
+    return _handle().read_robot_cam_frame(timeout)
+
+def read_robot_stereo(depth=False, timeout=None):
+    return _handle().read_robot_stereo(depth, timeout)
 
-def restart():
-    return request(SRRESET)
+def get_robot_pose(timeout=None):
+    return _handle().get_robot_pose(timeout)
 
-def end():
-    return request(SREND)
+def set_robot_pose(pose, timeout=None):
+    return _handle().set_robot_pose(pose, timeout)
 
-def step(num_steps=1):
-    return request((SRSTEP, num_steps))
+def read_robot_vels(timeout=None):
+    return _handle().read_robot_vels(timeout)
 
-def get_time():
-    return request(SRTIME)
+def command_robot_vels(lwheel_vel, rwheel_vel, timeout=None):
+    return _handle().command_robot_vels(lwheel_vel, rwheel_vel, timeout)
 
-def set_time(time):
-    return request((SRTIME, time))
+def get_enabled(timeout=None):
+    return _handle().get_enabled(timeout)
 
-def read_robot_cam():
-    return request(SRIMAGE)
+def set_enabled(enabled, timeout=None):
+    return _handle().set_enabled(enabled, timeout)
 
-def get_robot_pose():
-    return request(SRPOSE)
+def save_snapshot(name, timeout=None):
+    return _handle().save_snapshot(name, timeout)
 
-def set_robot_pose(pose):
-    return request((SRPOSE, pose))
+def restore_snapshot(name, timeout=None):
+    return _handle().restore_snapshot(name, timeout)
 
-def read_robot_vels():
-    return request(SRWHEELS)
+def list_snapshots(timeout=None):
+    return _handle().list_snapshots(timeout)
 
-def command_robot_vels(lwheel_vel, rwheel_vel):
-    return request((SRWHEELS, lwheel_vel, rwheel_vel))
+def evict_snapshot(name, timeout=None):
+    return _handle().evict_snapshot(name, timeout)
 
-def get_enabled():
-    return request(SRENABLED)
+def rewind(seconds, timeout=None):
+    return _handle().rewind(seconds, timeout)
 
-def set_enabled(enabled):
-    return request((SRENABLED, enabled))
+def act(lwheel_vel, rwheel_vel, num_steps=1, with_image=False, timeout=None):
+    return _handle().act(lwheel_vel, rwheel_vel, num_steps, with_image, timeout)
 
 '''
 function list
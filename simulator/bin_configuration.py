@@ -0,0 +1,92 @@
+"""
+File:           bin_configuration.py
+Author:         Binit Shah
+Last Modified:  Binit on 10/18
+"""
+
+import hashlib
+import re
+import yaml
+from typing import Dict, List, Tuple
+
+
+class BinConfiguration:
+    """
+    Reads the placement of the lego blocks in the bins from YAML files.
+
+    A bin configuration maps the name of each bin to the blocks in it.
+    Every block has an `x` and `y` position in meters, an optional `z`
+    height, and an rgb hex `color`:
+
+        bins:
+          left:
+            - {x: -0.4, y: -0.3, color: "#ff0000"}
+            - {x: -0.4, y: -0.35, z: 0.15, color: "#00ffff"}
+          right: []
+
+    Parsed and validated configurations are cached by the hash of the
+    file contents, so loading the same layout again only costs reading
+    and hashing the file. Sweeps over many layouts stay cheap, and an
+    edited file is never served from a stale cache entry.
+    """
+
+    """The height to spawn blocks at when the configuration has none"""
+    DEFAULT_HEIGHT = .1
+
+    # Spawn lists of every configuration loaded so far, keyed by the
+    #  sha1 of the file contents
+    _cache : Dict[str, Tuple[Tuple[float, float, float, str], ...]] = {}
+
+    @staticmethod
+    def load(fname: str) -> List[Tuple[float, float, float, str]]:
+        """Loads the spawn list of a bin configuration file.
+
+        :param fname: the path to the YAML file
+        :return: a list of tuples of x, y, z, and rgb hex, ready for
+            `Legos.load_lego_urdfs()`
+        :raises ValueError: if the configuration is malformed
+        """
+        with open(fname, 'rb') as f:
+            contents = f.read()
+        key = hashlib.sha1(contents).hexdigest()
+
+        spawn_list = BinConfiguration._cache.get(key)
+        if spawn_list is None:
+            spawn_list = BinConfiguration.parse(contents)
+            BinConfiguration._cache[key] = spawn_list
+        return list(spawn_list)
+
+    @staticmethod
+    def parse(contents: bytes) -> Tuple[Tuple[float, float, float, str], ...]:
+        """Parses and validates the contents of a bin configuration.
+
+        :param contents: the YAML document
+        :return: a tuple of tuples of x, y, z, and rgb hex
+        :raises ValueError: if the configuration is malformed
+        """
+        document = yaml.safe_load(contents)
+        if not isinstance(document, dict) or not isinstance(document.get('bins'), dict):
+            raise ValueError("Bin configuration must map `bins` to the blocks in each bin")
+
+        spawn_list = []
+        for bin_name, blocks in document['bins'].items():
+            # An empty bin can be written as `name:` too
+            for b in blocks or []:
+                try:
+                    b_x = float(b['x'])
+                    b_y = float(b['y'])
+                    b_z = float(b.get('z', BinConfiguration.DEFAULT_HEIGHT))
+                    b_color = str(b['color']).lower()
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError("Every block in bin `" + str(bin_name) +
+                                     "` needs a numeric `x` and `y`, and a `color`")
+                # Same check as `Legos.load_lego_urdfs()`, but up front
+                if re.fullmatch(r"#[0-9a-f]{6}", b_color) == None:
+                    raise ValueError("Must have valid rgb hex color, got " + b_color)
+                spawn_list.append((b_x, b_y, b_z, b_color))
+        return tuple(spawn_list)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Forgets every configuration loaded so far."""
+        BinConfiguration._cache.clear()
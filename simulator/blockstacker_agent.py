@@ -9,11 +9,15 @@ import pybullet as p
 
 from simulator.differentialdrive import DifferentialDrive
 from simulator.utilities import Utilities
+from simulator.camera import CameraConfig
 
 class BlockStackerAgent:
     """The BlockStackerAgent class maintains the blockstacker agent"""
-    def __init__(self, vel_delta=0.5, skew=0.0):
+    def __init__(self, vel_delta=0.5, skew=0.0, camera_config=None):
         """Setups infomation about the agent
+
+        :param camera_config: the CameraConfig of the robot camera,
+                              defaults to 300x300 frames.
         """
         self.camera_links = [6, 8]
         self.motor_links = [10, 12]
@@ -23,11 +27,14 @@ class BlockStackerAgent:
         self.caster_link = 18
         self.tower_link = 2
 
+        self.camera = camera_config if camera_config else CameraConfig()
+
         self.drive = DifferentialDrive(self.motor_links, max_force=0.2, vel_limit=6.0, vel_delta=vel_delta, skew=skew)
 
         self.enabled = True
-        self.blink = 0
-        self.blink_count = 0
+        # Seconds between toggles of the blinking LED while disabled
+        self.BLINK_INTERVAL = 41 / 240
+        self.led_color = None
 
     def load_urdf(self):
         """Load the URDF of the blockstacker into the environment
@@ -73,29 +80,56 @@ class BlockStackerAgent:
         self.drive.ltarget_vel = ltarget_vel
         return self.read_wheel_velocities()
 
-    def capture_image(self):
-        # Camera
+    def capture_image(self, out=None, alpha=True):
+        """Renders the robot camera.
+
+        :param out:   optional (height, width, 4|3) uint8 array to render into.
+        :param alpha: whether to keep the alpha channel when `out` is None.
+        :return:      the contiguous (height, width, 4|3) uint8 image.
+        """
         *_, camera_position, camera_orientation = p.getLinkState(self.robot, self.camera_links[0])
-        camera_look_position, _ = p.multiplyTransforms(camera_position, camera_orientation, [0,0.1,0], [0,0,0,1])
-        view_matrix = p.computeViewMatrix(
-          cameraEyePosition=camera_position,
-          cameraTargetPosition=camera_look_position,
-          cameraUpVector=(0, 0, 1))
-        projection_matrix = p.computeProjectionMatrixFOV(
-          fov=45.0,
-          aspect=1.0,
-          nearVal=0.1,
-          farVal=3.1)
-        return p.getCameraImage(300, 300, view_matrix, projection_matrix, renderer=p.ER_BULLET_HARDWARE_OPENGL)[2]
+        return self.camera.render(camera_position, camera_orientation, out=out, alpha=alpha)
+
+    def capture_stereo(self, out=None, depth=False, depth_out=None):
+        """Renders the left and right cameras as one synchronized pair.
+
+        Both camera link states come from a single query and the two
+        views are rendered back to back, so the pair shows the same
+        instant of the simulation.
+
+        :param out:       optional pair of (height, width, 4|3) uint8 arrays
+                          to render the left and right images into.
+        :param depth:     whether to also return the depth in meters.
+        :param depth_out: optional pair of (height, width) float32 arrays
+                          for the left and right depth.
+        :return:          (left, right) images, followed by (left_depth,
+                          right_depth) when depth is asked for.
+        """
+        out = out if out else (None, None)
+        depth_out = depth_out if depth_out else (None, None)
+        views = [self.camera.render(link_state[4], link_state[5], out=out[i],
+                                    depth=depth, depth_out=depth_out[i])
+                 for i, link_state in enumerate(p.getLinkStates(self.robot, self.camera_links))]
+        if not depth:
+            return tuple(views)
+        (left, left_depth), (right, right_depth) = views
+        return left, right, left_depth, right_depth
 
     def step(self):
         self.drive.step(self.robot, self.enabled)
 
+    def update_led(self, time):
+        """Shows whether the robot is enabled on its button LED.
+        The LED is yellow when enabled, and blinks white when disabled.
+        The shape is only changed when the color does.
+
+        :param time: the sim time, which the blinking follows.
+        """
         if not self.enabled:
-            p.changeVisualShape(self.robot, self.button_link, rgbaColor=[1, 1, self.blink, 1])
-            self.blink_count += 1
-            if self.blink_count > 40:
-                self.blink = not self.blink
-                self.blink_count = 0
+            blink = int(time / self.BLINK_INTERVAL) % 2
+            led_color = [1, 1, blink, 1]
         else:
-            p.changeVisualShape(self.robot, self.button_link, rgbaColor=[1, 1, 0, 1])
+            led_color = [1, 1, 0, 1]
+        if led_color != self.led_color:
+            p.changeVisualShape(self.robot, self.button_link, rgbaColor=led_color)
+            self.led_color = led_color
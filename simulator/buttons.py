@@ -5,12 +5,20 @@ Author:		   Ammar Ratnani
 Last Modified: Ammar on 9/25
 """
 
+import numpy as np
 import pybullet as p
 from typing import List, Iterator # Needed for typing syntax
 
 from simulator.utilities import Utilities
 
 
+def _read_only_digits(number: str) -> np.ndarray:
+    """Converts a string of decimal digits to a read-only array of them."""
+    digits = (np.frombuffer(number.encode('ascii'), dtype=np.uint8) - ord('0')).astype(np.int8)
+    digits.setflags(write=False)
+    return digits
+
+
 class Button:
     """A simple class to retain the state of a button.
 
@@ -18,39 +26,86 @@ class Button:
     It is deliberately structured very much like the code in the 
     `ArenaControl.ino` file, trying to keep as much parallelism between the 
     two to increase fidelity (hopefully).
+
+    The state itself lives in a `ButtonBank`, this is a view of one of its 
+    buttons. Reading or assigning an attribute reads or writes the bank's 
+    arrays.
     """
 
-    def __init__(self):
-        """Creates a button with its inital state.
+    def __init__(self, bank: 'ButtonBank' = None, field: int = 0, index: int = 0):
+        """Creates a view of a button in a bank.
 
         At the start of the competition, all buttons are unpressed and have 
-        their last state set to unpressed. This constructor emulates that. 
+        their last state set to unpressed, which is how a bank starts too. 
         The names of variables are also kept mostly the same, just changing 
         for style.
+
+        :param ButtonBank bank: the bank holding the state, a new bank with 
+            just this button when `None`
+        :param int field: the index of the field in the bank
+        :param int index: the index of the button on the field
         """
+        self._bank : ButtonBank = ButtonBank(1, 1) if bank is None else bank
+        self._index = (field, index)
+
+    @property
+    def joint_id(self) -> int:
+        """The joint index for the button. Must be assigned on field creation."""
+        return int(self._bank.joint_id[self._index])
 
-        # The joint index for the button
-        # Must be assigned on field creation
-        self.joint_id : int = -1
+    @joint_id.setter
+    def joint_id(self, value: int) -> None:
+        self._bank.joint_id[self._index] = value
 
-        # These are `int`s in the code, but they are treated as booleans
-        self.button_state : bool = False
+    # These are `int`s in the code, but they are treated as booleans
+    @property
+    def button_state(self) -> bool:
         """Represents the current state of the button."""
-        self.last_button_state : bool = False
+        return bool(self._bank.button_state[self._index])
+
+    @button_state.setter
+    def button_state(self, value: bool) -> None:
+        self._bank.button_state[self._index] = value
+
+    @property
+    def last_button_state(self) -> bool:
         """Represents the last read state of the button."""
+        return bool(self._bank.last_button_state[self._index])
 
-        # This is for simulation. We only change this in the `Buttons` class
-        self.reading : bool = False
+    @last_button_state.setter
+    def last_button_state(self, value: bool) -> None:
+        self._bank.last_button_state[self._index] = value
+
+    # This is for simulation. We only change this in the `Buttons` class
+    @property
+    def reading(self) -> bool:
         """Simulates the reading of the button."""
+        return bool(self._bank.reading[self._index])
+
+    @reading.setter
+    def reading(self, value: bool) -> None:
+        self._bank.reading[self._index] = value
 
-        self.last_debounce_time : float = 0.0 # in seconds
+    @property
+    def last_debounce_time(self) -> float:
         """Like the code, stores the last time the button changed its state."""
+        return float(self._bank.last_debounce_time[self._index])
 
-        self.lit : bool = False
+    @last_debounce_time.setter
+    def last_debounce_time(self, value: float) -> None:
+        self._bank.last_debounce_time[self._index] = value
+
+    @property
+    def lit(self) -> bool:
         """
         Added in later to check if a button is lit. Handled implicitly in the 
         code but necessarily handled explicitly for the simulation.
         """
+        return bool(self._bank.lit[self._index])
+
+    @lit.setter
+    def lit(self, value: bool) -> None:
+        self._bank.lit[self._index] = value
 
 
     def __str__(self) -> str:
@@ -135,37 +190,76 @@ class Buttons:
                 '30674427862203919494504712371378696095636437191728' + \
                 '74677646575739624138908658326459958133904780275900'
 
+    """The digits of `PI` as integers, shared by every instance."""
+    PI_DIGITS : np.ndarray = _read_only_digits(PI)
+
 
     def __init__(self, num_buttons: int = 10):
         """Sets up the simulated buttons.
 
-        Simply creates a list `num_buttons` long consisting of separate 
-        instances of the above `Button` class. Also creates some 
-        variables to keep track of time and scoring.
+        Creates a `ButtonBank` for a single field of `num_buttons` buttons, 
+        and a list of `Button` views into it. The bank also keeps track of 
+        time and scoring, which are exposed here as attributes.
 
         :param int num_buttons: the number of buttons on the wall
         """
-        # Required to create separate instances
-        self.button_state : List[Button] = [Button() for _ in range(num_buttons)]
+        self.bank : ButtonBank = ButtonBank(1, num_buttons)
+        self.button_state : List[Button] = [Button(self.bank, 0, i) for i in range(num_buttons)]
 
-        # Scoring
-        # Contains a slight change: instead of using `piDigitPosn`, just use 
-        #  `numSequenced`
-        self.in_sequence : bool = True
-        self.num_sequenced : int = 0
-        self.extra_not_sequenced : int = 0
 
-        # Also store the time of the simulation in seconds
-        self.time : float = 0.0
+    # Scoring
+    # Contains a slight change: instead of using `piDigitPosn`, just use 
+    #  `numSequenced`
+    @property
+    def in_sequence(self) -> bool:
+        """Whether every press so far followed the digits of PI."""
+        return bool(self.bank.in_sequence[0])
 
-        # Also store the flash timeout due to changing requirements
-        self.flash_timeout : float = 0.0
+    @in_sequence.setter
+    def in_sequence(self, value: bool) -> None:
+        self.bank.in_sequence[0] = value
 
-        # Rest of this is startup logic
-        
-        # Set the three button to lit
-        # We don't really care about the rest of `startCompetition()`
-        self.button_state[3].lit = True
+    @property
+    def num_sequenced(self) -> int:
+        """How many digits of PI were pressed in sequence."""
+        return int(self.bank.num_sequenced[0])
+
+    @num_sequenced.setter
+    def num_sequenced(self, value: int) -> None:
+        self.bank.num_sequenced[0] = value
+
+    @property
+    def extra_not_sequenced(self) -> int:
+        """How many presses did not follow the sequence."""
+        return int(self.bank.extra_not_sequenced[0])
+
+    @extra_not_sequenced.setter
+    def extra_not_sequenced(self, value: int) -> None:
+        self.bank.extra_not_sequenced[0] = value
+
+    @property
+    def expected_button(self) -> int:
+        """The button to press next to stay in sequence, -1 past the last
+        digit of `PI`."""
+        return int(self.bank.expected_button[0])
+
+    @property
+    def time(self) -> float:
+        """The time of the simulation in seconds."""
+        return float(self.bank.time[0])
+
+    @time.setter
+    def time(self, value: float) -> None:
+        self.bank.time[0] = value
+
+    @property
+    def flash_timeout(self) -> float:
+        """When the LEDs flashed by a wrong push turn off, 0 if they never did."""
+        return float(self.bank.flash_timeout[0])
+
+    @flash_timeout.setter
+    def flash_timeout(self, value: float) -> None:
+        self.bank.flash_timeout[0] = value
 
 
     def __str__(self) -> str:
@@ -258,89 +352,32 @@ class Buttons:
     def update_buttons(self, dt: float) -> None:
         """Updates all the buttons' states
 
-        By far the most involved function in this class, simulating both 
-        the `debounce_buttons()` and `loop()` methods in `ArenaControl.ino`.
-        Flashing LEDs are not simulated, as they don't affect button pushes.
-        This may change in the future. Also runs indefinitely for now. If 
-        there is a bug, this is the most likely place for it to be. For best 
+        Simulates both the `debounce_buttons()` and `loop()` methods in 
+        `ArenaControl.ino`, see `ButtonBank.update_buttons()`. For best 
         fidelity, this method should only be called with small timesteps. It 
         should work even with large timesteps, but you may not get some points 
         which you should have.
 
         :param float dt: the time passed in simulation
         """
-        # Suppose a certain (possibly zero) amount of time has passed
-        self.time += dt
+        self.bank.update_buttons(dt)
 
-        # Whether a new button has been pressed
-        new_press : bool = False
-        # How many are pressed
-        num_pressed : int = 0
 
-        # Logic in the first half of `loop()`
-        # Check for flashing LEDs
-        if self.flash_timeout != 0.0 and self.time > self.flash_timeout:
-            # `setAllLEDs(false)`
-            for b in self.button_state:
-                b.lit = False
+    def apply_readings(self, positions, threshold: float, dt: float) -> None:
+        """Reads every button from its joint position, then updates them
 
-        # `debounceButtons()`
-        # i -> digit; b -> buttonState[digit]
-        for i,b in enumerate(self.button_state):
-            # It doesn't matter if it changed because noise or press
-            if b.reading != b.last_button_state:
-                b.last_debounce_time = self.time
-            # If a reading has stayed for a certain amount of time
-            # Note that this is a strict greater than
-            if (self.time - b.last_debounce_time) > Buttons.DEBOUNCE_DELAY:
-                # Only do this if the state has changed
-                if b.reading != b.button_state:
-                    b.button_state = b.reading
-                    # If the state changed to pressed
-                    if b.button_state:
-                        new_press = True
-            # If the button is pressed, update `num_pressed`
-            if b.button_state:
-                num_pressed += 1
-            # Save the reading
-            b.last_button_state = b.reading
-
-        # Logic in the second half of `loop()`
-        if num_pressed == 0:
-            # Bad style, but this is what the code does
-            pass
-        # Currently in sequence
-        elif self.in_sequence:
-            # We aren't sequencing if more than one pressed
-            if num_pressed > 1:
-                self.in_sequence = False
-                # `flashAllLEDs()`
-                for b in self.button_state:
-                    b.lit = True
-                self.flash_timeout = self.time + Buttons.FLASH_INTERVAL
-            elif new_press:
-                digit = int(Buttons.PI[self.num_sequenced])
-                if not self.button_state[digit].button_state:
-                    self.in_sequence = False
-                    self.extra_not_sequenced += 1
-                    # `flashAllLEDs()`
-                    for b in self.button_state:
-                        b.lit = True
-                    self.flash_timeout = self.time + Buttons.FLASH_INTERVAL
-                else:
-                    self.button_state[digit].lit = False
-                    self.num_sequenced += 1
-                    # Get the new digit and light it up
-                    digit = int(Buttons.PI[self.num_sequenced])
-                    self.button_state[digit].lit = True
-        # Case not in sequence
-        else:
-            if new_press:
-                self.extra_not_sequenced += 1
-                # `flashAllLEDs()`
-                for b in self.button_state:
-                    b.lit = True
-                self.flash_timeout = self.time + Buttons.FLASH_INTERVAL
+        Unlike calling `press_button()` or `unpress_button()` for each 
+        button, this sets all the readings at once and runs a single 
+        `update_buttons()`. It is how the Arduino sees the wall too: every 
+        button is read, then the readings are debounced together.
+
+        :param positions: the joint positions of the buttons, in order
+        :param float threshold: a button reads pressed when its joint is 
+            below this position
+        :param float dt: the time passed in simulation since the last update
+        :raises ValueError: if there isn't one position per button
+        """
+        self.bank.apply_readings(np.asarray(positions)[None], threshold, dt)
 
 
     def button_status(self, button_num: int) -> Button:
@@ -372,3 +409,169 @@ class Buttons:
         """
         for i,b in enumerate(self.button_state):
             b.joint_id = jids[i]
+
+
+class ButtonBank:
+    """The state of the button walls of one or more fields, as arrays.
+
+    Every per button variable of `Button` is an array of shape 
+    `(num_fields, num_buttons)`, and every per field variable of `Buttons` 
+    is an array of shape `(num_fields,)`. `update_buttons()` then runs the 
+    `ArenaControl.ino` logic for all of them with a fixed number of NumPy 
+    operations, instead of looping over buttons in Python. Many simulated 
+    fields can share one bank and be updated together.
+
+    `Buttons` and `Button` are views of a single field of a bank, use them 
+    when one field is all that's needed.
+    """
+
+    def __init__(self, num_fields: int = 1, num_buttons: int = 10):
+        """Sets up the buttons of every field as they are at the start.
+
+        All buttons are unpressed and have their last state set to 
+        unpressed, and the button of the first digit of PI is lit.
+
+        :param int num_fields: the number of fields
+        :param int num_buttons: the number of buttons on each wall
+        """
+        shape = (num_fields, num_buttons)
+
+        # Per button, see `Button`
+        self.joint_id : np.ndarray = np.full(shape, -1, dtype=np.int64)
+        self.button_state : np.ndarray = np.zeros(shape, dtype=bool)
+        self.last_button_state : np.ndarray = np.zeros(shape, dtype=bool)
+        self.reading : np.ndarray = np.zeros(shape, dtype=bool)
+        self.last_debounce_time : np.ndarray = np.zeros(shape, dtype=np.float64)
+        self.lit : np.ndarray = np.zeros(shape, dtype=bool)
+
+        # Per field, see `Buttons`
+        self.in_sequence : np.ndarray = np.ones(num_fields, dtype=bool)
+        self.num_sequenced : np.ndarray = np.zeros(num_fields, dtype=np.int64)
+        self.extra_not_sequenced : np.ndarray = np.zeros(num_fields, dtype=np.int64)
+        self.time : np.ndarray = np.zeros(num_fields, dtype=np.float64)
+        self.flash_timeout : np.ndarray = np.zeros(num_fields, dtype=np.float64)
+
+        # Rest of this is startup logic
+        # Light the first digit, we don't really care about the rest of 
+        #  `startCompetition()`
+        self._light_expected(np.arange(num_fields))
+
+
+    @property
+    def num_fields(self) -> int:
+        """The number of fields in this bank."""
+        return self.button_state.shape[0]
+
+
+    @property
+    def num_buttons(self) -> int:
+        """The number of buttons on each wall."""
+        return self.button_state.shape[1]
+
+
+    @property
+    def expected_button(self) -> np.ndarray:
+        """The button each field has to press next to stay in sequence.
+
+        Looked up in `Buttons.PI_DIGITS` by `num_sequenced`. Once all of 
+        its digits are sequenced there is nothing left to press in 
+        sequence, and the expected button is -1.
+        """
+        num_digits = len(Buttons.PI_DIGITS)
+        return np.where(self.num_sequenced < num_digits,
+                        Buttons.PI_DIGITS[np.minimum(self.num_sequenced, num_digits - 1)],
+                        -1)
+
+
+    def _light_expected(self, fields: np.ndarray) -> None:
+        """Lights the expected button of the given fields, if it has one."""
+        digits = self.expected_button[fields]
+        has_button = (digits >= 0) & (digits < self.num_buttons)
+        self.lit[fields[has_button], digits[has_button]] = True
+
+
+    def apply_readings(self, positions, threshold: float, dt) -> None:
+        """Reads every button from its joint position, then updates them
+
+        :param positions: the joint positions, shaped like the buttons
+        :param float threshold: a button reads pressed when its joint is 
+            below this position
+        :param dt: the time passed in simulation, see `update_buttons()`
+        :raises ValueError: if the positions aren't shaped like the buttons
+        """
+        positions = np.asarray(positions)
+        if positions.shape != self.reading.shape:
+            raise ValueError("expected joint positions of shape " + str(self.reading.shape) +
+                             ", got " + str(positions.shape))
+        np.less(positions, threshold, out=self.reading)
+        self.update_buttons(dt)
+
+
+    def update_buttons(self, dt) -> None:
+        """Updates the states of all the buttons on every field
+
+        Does the same as the `debounce_buttons()` and `loop()` methods in 
+        `ArenaControl.ino`, for every field at once. Each step of the 
+        original is computed for all fields, and masks pick the fields it 
+        applies to.
+
+        :param dt: the time passed in simulation, a float for all fields or 
+            an array with one per field
+        """
+        # Suppose a certain (possibly zero) amount of time has passed
+        self.time += dt
+
+        # Logic in the first half of `loop()`
+        # Check for flashing LEDs, `setAllLEDs(false)`
+        flash_over = (self.flash_timeout != 0.0) & (self.time > self.flash_timeout)
+        np.copyto(self.lit, False, where=flash_over[:, None])
+
+        # `debounceButtons()`
+        # It doesn't matter if it changed because noise or press
+        time = self.time[:, None]
+        np.copyto(self.last_debounce_time, time, where=self.reading != self.last_button_state)
+        # If a reading has stayed for a certain amount of time, and the state 
+        #  has changed. Note that this is a strict greater than
+        toggled = (time - self.last_debounce_time) > Buttons.DEBOUNCE_DELAY
+        toggled &= self.reading != self.button_state
+        np.copyto(self.button_state, self.reading, where=toggled)
+        # Save the reading
+        np.copyto(self.last_button_state, self.reading)
+
+        # Logic in the second half of `loop()`, fields with nothing pressed 
+        #  are left alone
+        if not self.button_state.any():
+            return
+        num_pressed = self.button_state.sum(axis=1)
+        # Whether a new button has been pressed
+        new_press = (toggled & self.button_state).any(axis=1)
+        # We aren't sequencing if more than one pressed
+        multiple = self.in_sequence & (num_pressed > 1)
+        # A single new press while in sequence, right or wrong
+        single = self.in_sequence & (num_pressed == 1) & new_press
+        # Any new press while out of sequence
+        extra = ~self.in_sequence & (num_pressed > 0) & new_press
+
+        wrong = np.zeros_like(single)
+        fields = np.flatnonzero(single)
+        if fields.size:
+            digits = self.expected_button[fields]
+            # Past the last digit, no press is in sequence
+            has_button = (digits >= 0) & (digits < self.num_buttons)
+            right = np.zeros(fields.size, dtype=bool)
+            right[has_button] = self.button_state[fields[has_button], digits[has_button]]
+            wrong[fields[~right]] = True
+
+            fields, digits = fields[right], digits[right]
+            self.lit[fields, digits] = False
+            self.num_sequenced[fields] += 1
+            # Get the new digit and light it up
+            self._light_expected(fields)
+
+        self.in_sequence &= ~(multiple | wrong)
+        self.extra_not_sequenced += wrong | extra
+
+        # `flashAllLEDs()`
+        flash = multiple | wrong | extra
+        np.copyto(self.lit, True, where=flash[:, None])
+        np.copyto(self.flash_timeout, self.time + Buttons.FLASH_INTERVAL, where=flash)
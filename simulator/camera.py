@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+File:          camera.py
+Author:        Binit Shah
+Last Modified: Binit on 10/18
+"""
+
+import numpy as np
+import pybullet as p
+
+from simulator.utilities import Utilities
+
+class CameraConfig:
+    """The CameraConfig class describes how an agent's camera renders
+
+    The projection matrix only depends on these settings, so it is
+    computed once here instead of on every capture. Make a new config
+    rather than changing the settings of an existing one.
+    """
+    def __init__(self,
+                 width=300,
+                 height=300,
+                 fov=45.0,
+                 near=0.1,
+                 far=3.1,
+                 renderer=p.ER_BULLET_HARDWARE_OPENGL,
+                 frame_rate=0.0):
+        """Sets up the camera settings.
+
+        :param width:      the width of a frame in pixels.
+        :param height:     the height of a frame in pixels.
+        :param fov:        the vertical field of view in degrees.
+        :param near:       the near clipping plane in meters.
+        :param far:        the far clipping plane in meters.
+        :param renderer:   p.ER_BULLET_HARDWARE_OPENGL, or p.ER_TINY_RENDERER
+                           which is cheaper for small frames on headless runs.
+        :param frame_rate: frames per simulated second the game renders at,
+                           0 renders on demand whenever a frame is read.
+        """
+        self.width = width
+        self.height = height
+        self.fov = fov
+        self.near = near
+        self.far = far
+        self.renderer = renderer
+        self.frame_rate = frame_rate
+        self.projection_matrix = p.computeProjectionMatrixFOV(fov=fov,
+                                                              aspect=width / height,
+                                                              nearVal=near,
+                                                              farVal=far)
+
+    @property
+    def frame_shape(self):
+        """The shape of a rendered RGBA frame."""
+        return (self.height, self.width, 4)
+
+    def depth_to_meters(self, depth_buffer, out=None):
+        """Converts a [0, 1] OpenGL depth buffer into distances in meters.
+
+        :param depth_buffer: the depth buffer from getCameraImage.
+        :param out:          optional (height, width) float32 array to write into.
+        :return:             the (height, width) float32 depth in meters.
+        """
+        depth_buffer = np.asarray(depth_buffer, dtype=np.float32).reshape(self.height, self.width)
+        if out is None:
+            out = np.empty((self.height, self.width), dtype=np.float32)
+        np.multiply(depth_buffer, self.far - self.near, out=out)
+        np.subtract(self.far, out, out=out)
+        np.divide(self.far * self.near, out, out=out)
+        return out
+
+    def render(self, camera_position, camera_orientation, out=None, alpha=True,
+               depth=False, depth_out=None):
+        """Renders a frame from a camera link's world pose.
+
+        The camera looks along the link's y axis with z up.
+
+        :param camera_position:    the world position of the camera link.
+        :param camera_orientation: the world orientation of the camera link.
+        :param out:                optional (height, width, 4|3) uint8 array to render into.
+        :param alpha:              whether to keep the alpha channel when `out` is None.
+        :param depth:              whether to also return the depth in meters.
+        :param depth_out:          optional (height, width) float32 array for the depth.
+        :return:                   the contiguous (height, width, 4|3) uint8 image, and
+                                   the (height, width) float32 depth when asked for.
+        """
+        camera_look_position, _ = p.multiplyTransforms(camera_position, camera_orientation, [0,0.1,0], [0,0,0,1])
+        view_matrix = p.computeViewMatrix(
+          cameraEyePosition=camera_position,
+          cameraTargetPosition=camera_look_position,
+          cameraUpVector=(0, 0, 1))
+        _, _, pixels, depth_buffer, _ = p.getCameraImage(self.width, self.height,
+                                                         view_matrix, self.projection_matrix,
+                                                         renderer=self.renderer)
+        image = Utilities.camera_image_to_array(pixels, self.width, self.height, out=out, alpha=alpha)
+        if not depth:
+            return image
+        return image, self.depth_to_meters(depth_buffer, out=depth_out)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+File:          frame_ring.py
+Author:        Binit Shah
+Last Modified: Binit on 10/18
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+class FrameRing:
+    """A ring of preallocated frame buffers in shared memory.
+
+    One process writes frames into the slots in turn and only sends the
+    slot index to the other side, which reads the pixels in place
+    instead of unpickling them. A slot is overwritten once the writer
+    has gone all the way around the ring, so readers that keep a frame
+    for longer must copy it.
+    """
+    def __init__(self, num_frames, frame_shape, dtype=np.uint8, name=None):
+        """Creates the ring, or attaches to an existing one by name.
+
+        :param num_frames:  the number of slots in the ring.
+        :param frame_shape: the shape of a single frame.
+        :param dtype:       the element type of a frame.
+        :param name:        the shared memory block to attach to, a new
+                            block is created and owned when None.
+        """
+        self.num_frames = num_frames
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.is_owner = name is None
+
+        frame_nbytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name,
+                                              create=self.is_owner,
+                                              size=frame_nbytes * num_frames)
+        self.frames = np.ndarray((num_frames,) + self.frame_shape,
+                                 dtype=self.dtype, buffer=self.shm.buf)
+        self.seq = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def next_slot(self):
+        """Claims the next slot for writing.
+
+        :return: the slot index and the sequence number of the frame.
+        """
+        seq = self.seq
+        self.seq += 1
+        return seq % self.num_frames, seq
+
+    def view(self, slot, shape, dtype):
+        """Reinterprets the bytes of a slot as another array.
+        Lets data of the same size, like a float32 depth map next to
+        RGBA8 frames, share the ring.
+
+        :param slot:  the slot index.
+        :param shape: the shape of the array in the slot.
+        :param dtype: the element type of the array in the slot.
+        :return:      a view of the slot.
+        """
+        return self.frames[slot].reshape(-1).view(dtype)[:int(np.prod(shape))].reshape(shape)
+
+    def close(self):
+        """Detaches from the ring, and frees it if this side created it."""
+        # The buffer can't be released while an array still views it
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A reader still holds a frame, the mapping goes away with it
+            pass
+        if self.is_owner:
+            self.shm.unlink()
@@ -6,14 +6,22 @@ Last Modified: Binit on 2/15
 """
 
 import os
+import copy
 import time
+import collections
+import numpy as np
 import pybullet as p
 
 from simulator.field import Field
 from simulator.legos import Legos
+from simulator.bin_configuration import BinConfiguration
 from simulator.trainingbot_agent import TrainingBotAgent
 from simulator.blockstacker_agent import BlockStackerAgent
 from simulator.utilities import Utilities
+from simulator.state_logger import StateLogger
+from simulator.video_recorder import VideoRecorder
+from simulator.telemetry import TelemetryRecorder
+from simulator.scheduler import Scheduler
 
 class Game:
     """Maintains information of one 3 minute round"""
@@ -26,7 +34,13 @@ class Game:
                  log_dir=None,
                  log_bullet_states=False,
                  log_mp4=False,
-                 robot_skew=0.0):
+                 log_telemetry=False,
+                 robot_skew=0.0,
+                 camera_config=None,
+                 max_snapshots=64,
+                 rewind_interval=0.0,
+                 rewind_capacity=120,
+                 video_fps=30.0):
         """Sets up simulation elements.
         Two sets of preferences affect how the simulation behaves. Choosing a
         interactive simulation session allows you to interact with the robot
@@ -48,11 +62,26 @@ class Game:
         :param log_dir:                 the directory in which to log.
         :param log_bullet_states:       logs .bullet sim states every 5.0 sec or
                                         every 1200 iterations.
-        :param log_mp4:                 when interactive, logs .mp4 video until sim
-                                        completes via a graceful stop (corrupts log
-                                        if sim ends ungracefully).
+        :param log_mp4:                 logs .mp4 video until sim completes via a
+                                        graceful stop (corrupts log if sim ends
+                                        ungracefully). Interactive sessions record
+                                        the viewport, headless ones record a fixed
+                                        overview camera with ffmpeg.
+        :param log_telemetry:           logs the robot's pose, wheel velocities,
+                                        and collected legos every step to
+                                        telemetry.npy.
         :param robot_skew:              [-inf, inf] where negative values skew left,
                                         0 is no skew, and positive skew right
+        :param camera_config:           the CameraConfig of the robot camera, sets
+                                        its resolution, lens, and renderer.
+        :param max_snapshots:           how many named snapshots to keep in memory,
+                                        the least recently used are evicted first.
+        :param rewind_interval:         sim seconds between the states kept for
+                                        rewinding, 0 disables rewinding.
+        :param rewind_capacity:         how many states to keep for rewinding, the
+                                        oldest are dropped first.
+        :param video_fps:               frames per simulated second of the headless
+                                        .mp4 video.
         """
         self.use_interactive = use_interactive
         self.is_interactive_realtime = is_interactive_realtime
@@ -63,6 +92,13 @@ class Game:
         self.log_mp4 = log_mp4
         self.TIMESTEPPING_DT = 1 / 240
         self.PRESSED_THRES = -.0038
+        self.STATE_LOG_INTERVAL = 5.0 # 1200 iterations when timestepping
+        # Sim seconds between runs of the slower subsystems
+        self.BUTTON_MONITOR_PERIOD = .01  # 2.5 reads per 25 ms debounce
+        self.LEGO_PICKUP_PERIOD = 1 / 120 # moves ~1 mm, well within pickup distance
+        self.UI_PERIOD = 1 / 30
+        self.DEBUG_INFO_PERIOD = .25      # only shows whole seconds
+        self.LED_PERIOD = 1 / 30
 
         p.connect(p.GUI if self.use_interactive else p.DIRECT)
         p.resetSimulation()
@@ -72,20 +108,64 @@ class Game:
         else:
             p.resetDebugVisualizerCamera(2, 30.0, -50.0, (0.0, 0.2, 0.0))
         p.setGravity(0, 0, -9.8)
+        if self.log_mp4 and not self.log_dir:
+            raise ValueError("log_mp4 needs a log_dir")
+        self.video_recorder = None
+        self.mp4_log_id = None
         if self.log_mp4:
-            p.startStateLogging(p.STATE_LOGGING_VIDEO_MP4, os.join(self.log_dir, "log.mp4"))
+            os.makedirs(self.log_dir, exist_ok=True)
+            if self.use_interactive:
+                self.mp4_log_id = p.startStateLogging(p.STATE_LOGGING_VIDEO_MP4, os.path.join(self.log_dir, "log.mp4"))
+            else:
+                # pybullet only records the GUI's viewport, so headless sessions
+                #  render their own frames and encode them in the background
+                self.video_recorder = VideoRecorder(os.path.join(self.log_dir, "log.mp4"),
+                                                    topdown=self.topdown_viewport,
+                                                    fps=video_fps)
         p.setRealTimeSimulation(1 if self.is_interactive_realtime else 0)
 
-        self.mobile_agent = BlockStackerAgent(skew=robot_skew)
+        self.mobile_agent = BlockStackerAgent(skew=robot_skew, camera_config=camera_config)
         self.field = Field()
         self.legos = Legos()
 
+        self.state_logger = None
+        if self.log_bullet_states:
+            if not self.log_dir:
+                raise ValueError("log_bullet_states needs a log_dir")
+            self.state_logger = StateLogger(self.log_dir)
+
+        self.telemetry = None
+        if log_telemetry:
+            if not self.log_dir:
+                raise ValueError("log_telemetry needs a log_dir")
+            os.makedirs(self.log_dir, exist_ok=True)
+            self.telemetry = TelemetryRecorder(os.path.join(self.log_dir, "telemetry.npy"))
+
+        # Named in-memory snapshots, least recently used first
+        self.max_snapshots = max_snapshots
+        self.snapshots = collections.OrderedDict()
+
+        # Ring buffer of periodic (time, physics state, game state) to rewind to
+        self.rewind_interval = rewind_interval
+        self.rewind_buffer = collections.deque()
+        self.rewind_capacity = rewind_capacity
+
+        # Latest robot camera frame, when it was rendered, and how many came before it
+        self.camera_frame = np.empty(self.mobile_agent.camera.frame_shape, dtype=np.uint8)
+        self.camera_frame_time = None
+        self.camera_frame_seq = -1
+
     def load_environment(self, bin_configuration_yaml):
         """Loading the env objects
         Including field, buttons, and more.
+
+        :param bin_configuration_yaml: the yaml file placing the blocks in
+                                       the bins, data/bins/default.yaml when empty.
         """
         self.field.load_urdf()
-        self.legos.load_lego_urdfs([(0, -0.3, 0.1, "#00ffff")])
+        if not bin_configuration_yaml:
+            bin_configuration_yaml = Utilities.gen_urdf_path("bins/default.yaml")
+        self.legos.load_lego_urdfs(BinConfiguration.load(bin_configuration_yaml))
 
     def load_agents(self, initial_mobile_pose=None):
         """Loading the agents
@@ -108,18 +188,18 @@ class Game:
         maxForce = p.readUserDebugParameter(self.maxForceSlider)
         self.mobile_agent.drive.set_max_force(maxForce)
 
-    def monitor_buttons(self):
-        # Store the return values for readability
-        buttonStates = p.getJointStates(
-                            self.field.model_id,
-                            [b.joint_id for b in self.field.buttons])
+    def update_debug_info(self):
+        """Redraws the clock."""
+        self.info_id = Utilities.draw_debug_info(self.time, replaceItemUniqueId=self.info_id)
 
-        # Get every button and press it if needed
-        for i,x in enumerate(buttonStates):
-            if x[0] < self.PRESSED_THRES:
-                self.field.buttons.press_button(i)
-            else:
-                self.field.buttons.unpress_button(i)
+    def monitor_buttons(self, dt):
+        """Reads the button joints and updates the buttons' scoring.
+        One getJointStates call for all of them, and a single debounce update.
+
+        :param dt: the sim time since the buttons were last monitored.
+        """
+        button_states = p.getJointStates(self.field.model_id, self.button_joint_ids)
+        self.field.buttons.apply_readings([s[0] for s in button_states], self.PRESSED_THRES, dt)
     
     def setup(self,
               bin_configuration_yaml,
@@ -137,12 +217,14 @@ class Game:
         """
         self.load_environment(bin_configuration_yaml)
         self.load_agents(initial_mobile_pose=starting_robot_pose)
+        self.button_joint_ids = [b.joint_id for b in self.field.buttons]
         if not self.hide_ui:
             self.load_ui()
 
         if starting_state_fname:
             p.restoreState(fileName=starting_state_fname)
         self.starting_state = p.saveState()
+        self.starting_buttons = copy.deepcopy(self.field.buttons)
 
         self.initial_auto_enable_timer = auto_enable_timer
         self.auto_enable_timer = self.initial_auto_enable_timer
@@ -154,23 +236,232 @@ class Game:
             self.prev = time.time()
 
         self.info_id = Utilities.draw_debug_info(self.time)
+        self.episode = 0
+
+        self.scheduler = Scheduler(self.time)
+        self.scheduler.register("buttons", self.BUTTON_MONITOR_PERIOD, self.monitor_buttons)
+        self.scheduler.register("legos", self.LEGO_PICKUP_PERIOD,
+                                lambda dt: self.legos.step(self.mobile_agent.robot, self.mobile_agent.tower_link))
+        if not self.hide_ui:
+            self.scheduler.register("ui", self.UI_PERIOD, lambda dt: self.read_ui())
+        self.scheduler.register("debug_info", self.DEBUG_INFO_PERIOD, lambda dt: self.update_debug_info())
+        self.scheduler.register("led", self.LED_PERIOD, lambda dt: self.mobile_agent.update_led(self.time))
+        if self.mobile_agent.camera.frame_rate > 0.0:
+            self.scheduler.register("camera", 1 / self.mobile_agent.camera.frame_rate,
+                                    lambda dt: self.capture_camera())
+        if self.rewind_interval > 0.0:
+            self.scheduler.register("rewind", self.rewind_interval, lambda dt: self.update_rewind())
+        if self.state_logger is not None:
+            self.scheduler.register("state_log", self.STATE_LOG_INTERVAL, lambda dt: self.update_state_log())
+        if self.video_recorder is not None:
+            self.scheduler.register("video", 1 / self.video_recorder.fps, lambda dt: self.video_recorder.record())
 
     def reset(self):
         p.restoreState(self.starting_state)
+        self.legos.reset()
+        self.field.buttons = copy.deepcopy(self.starting_buttons)
         self.time = self.starting_time
         self.auto_enable_timer = self.initial_auto_enable_timer
         self.auto_enabled = False
+        self.camera_frame_time = None
+        self.episode += 1
+        self.clear_rewind()
+        self.scheduler.reset(self.time)
         return self.time
 
+    def get_game_state(self):
+        """Returns the game state that lives outside of the physics engine.
+        Together with `p.saveState()` it captures the whole simulation.
+        """
+        return {
+            "time": self.time,
+            "auto_enable_timer": self.auto_enable_timer,
+            "auto_enabled": self.auto_enabled,
+            "enabled": self.mobile_agent.enabled,
+            "target_vels": (self.mobile_agent.drive.ltarget_vel, self.mobile_agent.drive.rtarget_vel),
+            "legos": self.legos.get_state(),
+            "buttons": copy.deepcopy(self.field.buttons),
+        }
+
+    def set_game_state(self, game_state):
+        """Restores a state from `get_game_state()`.
+        Call it after `p.restoreState()` of the matching physics state.
+        """
+        self.time = game_state["time"]
+        self.auto_enable_timer = game_state["auto_enable_timer"]
+        self.auto_enabled = game_state["auto_enabled"]
+        self.mobile_agent.enabled = game_state["enabled"]
+        self.mobile_agent.drive.ltarget_vel, self.mobile_agent.drive.rtarget_vel = game_state["target_vels"]
+        self.legos.set_state(game_state["legos"])
+        # Copy again so the state can be restored more than once
+        self.field.buttons = copy.deepcopy(game_state["buttons"])
+        self.camera_frame_time = None
+        self.scheduler.reset(self.time)
+
+    def save_snapshot(self, name):
+        """Saves the current state in memory under a name.
+        Episodes can then branch off from it without reloading anything.
+        Saving over an existing name replaces it, and the least recently
+        used snapshot is evicted once there are more than `max_snapshots`.
+
+        :param name: the name of the snapshot.
+        :return:     the sim time of the snapshot.
+        """
+        if name in self.snapshots:
+            self.evict_snapshot(name)
+        self.snapshots[name] = (p.saveState(), self.get_game_state())
+        while len(self.snapshots) > self.max_snapshots:
+            self.evict_snapshot(next(iter(self.snapshots)))
+        return self.time
+
+    def restore_snapshot(self, name):
+        """Returns the simulation to a saved snapshot.
+
+        :param name: the name of the snapshot.
+        :return:     the sim time after restoring.
+        :raises KeyError: if there is no snapshot with that name.
+        """
+        if name not in self.snapshots:
+            raise KeyError("no snapshot named {}".format(name))
+        self.snapshots.move_to_end(name)
+        state_id, game_state = self.snapshots[name]
+        p.restoreState(state_id)
+        self.set_game_state(game_state)
+        # The kept states belong to a history we just left
+        self.clear_rewind()
+        return self.time
+
+    def list_snapshots(self):
+        """Lists the snapshot names, least recently used first."""
+        return list(self.snapshots)
+
+    def evict_snapshot(self, name):
+        """Frees a snapshot.
+
+        :param name: the name of the snapshot.
+        :raises KeyError: if there is no snapshot with that name.
+        """
+        if name not in self.snapshots:
+            raise KeyError("no snapshot named {}".format(name))
+        state_id, _ = self.snapshots.pop(name)
+        p.removeState(state_id)
+
+    def update_rewind(self):
+        """Keeps a state for rewinding, every `rewind_interval` seconds.
+        Only an in-memory `p.saveState()` happens here, so it is cheap
+        enough to leave on during long runs.
+        """
+        self.rewind_buffer.append((self.time, p.saveState(), self.get_game_state()))
+        while len(self.rewind_buffer) > self.rewind_capacity:
+            _, state_id, _ = self.rewind_buffer.popleft()
+            p.removeState(state_id)
+
+    def clear_rewind(self):
+        """Drops every state kept for rewinding."""
+        while self.rewind_buffer:
+            _, state_id, _ = self.rewind_buffer.pop()
+            p.removeState(state_id)
+
+    def rewind(self, seconds):
+        """Jumps back in time to re-run the last few seconds.
+
+        Restores the latest kept state at least `seconds` old, or the
+        oldest one when the buffer does not reach back that far. Later
+        states are dropped since that future is being re-run.
+
+        :param seconds: how far back to go in sim seconds.
+        :return:        the sim time after rewinding, None when no state
+                        has been kept.
+        """
+        if not self.rewind_buffer:
+            return None
+        target = self.time - seconds
+        while len(self.rewind_buffer) > 1 and self.rewind_buffer[-1][0] > target:
+            _, state_id, _ = self.rewind_buffer.pop()
+            p.removeState(state_id)
+        rewind_time, state_id, game_state = self.rewind_buffer[-1]
+        p.restoreState(state_id)
+        self.set_game_state(game_state)
+        # The state at `rewind_time` is already kept
+        self.scheduler.restart("rewind", rewind_time)
+        return self.time
+
+    def update_state_log(self):
+        """Logs a .bullet state every `STATE_LOG_INTERVAL` seconds.
+        The file is written in the background by the StateLogger, and is
+        named after the episode and time so resets don't overwrite it.
+        """
+        self.state_logger.log("state_{:03d}_{:07.2f}.bullet".format(self.episode, self.time))
+
+    def update_telemetry(self):
+        """Records this step's row of telemetry."""
+        if self.telemetry is None:
+            return
+        position, orientation = p.getBasePositionAndOrientation(self.mobile_agent.robot)
+        drive = self.mobile_agent.drive
+        self.telemetry.record(self.time, position, orientation,
+                              self.mobile_agent.read_wheel_velocities(noisy=False),
+                              (drive.rtarget_vel, drive.ltarget_vel),
+                              self.mobile_agent.enabled,
+                              len(self.legos.parked_ids))
+
+    def close(self):
+        """Finishes writing the logs, call it before the sim ends."""
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
+        if self.state_logger is not None:
+            self.state_logger.close()
+            self.state_logger = None
+        if self.video_recorder is not None:
+            self.video_recorder.close()
+            self.video_recorder = None
+        if self.mp4_log_id is not None:
+            p.stopStateLogging(self.mp4_log_id)
+            self.mp4_log_id = None
+
+    def capture_camera(self, out=None):
+        """Renders the robot camera as of the current sim time.
+
+        :param out: the array to render into, the latest-frame cache by default.
+        :return:    the rendered frame.
+        """
+        frame = self.mobile_agent.capture_image(out=self.camera_frame if out is None else out)
+        self.camera_frame_time = self.time
+        self.camera_frame_seq += 1
+        return frame
+
+    def read_camera(self, out=None):
+        """Reads the robot camera like the real, free running one.
+
+        With a camera frame rate the most recent cached frame is returned
+        without rendering, `camera_frame_time` tells how old it is.
+        Otherwise a frame is rendered on demand.
+
+        :param out: optional (height, width, 4|3) uint8 array to copy into.
+        :return:    the frame.
+        """
+        frame_rate = self.mobile_agent.camera.frame_rate
+        if frame_rate <= 0.0:
+            return self.capture_camera(out)
+        if self.camera_frame_time is None:
+            self.capture_camera()
+            self.scheduler.restart("camera", self.time)
+        if out is None:
+            return self.camera_frame
+        out[...] = self.camera_frame[..., :out.shape[2]]
+        return out
+
     def step(self):
         """One step of the simulation
         Needs to run to for both realtime and timestepping sessions.
         """
         if self.use_interactive and self.is_interactive_realtime:
             now = time.time()
-            self.time += now - self.prev
+            dt = now - self.prev
+            self.time += dt
             if not self.auto_enabled and self.auto_enable_timer > 0.0:
-                self.auto_enable_timer -= now - self.prev
+                self.auto_enable_timer -= dt
                 if self.auto_enable_timer <= 0.0:
                     self.mobile_agent.enabled = True
                     self.auto_enabled = True
@@ -179,24 +470,21 @@ class Game:
             # if self.time - self.starting_time <= 10.0:
             #     print("velocities ", self.mobile_agent.read_wheel_velocities())
             #     print("world pose ", self.mobile_agent.get_pose())
-            # TODO - log bullet states every 5 seconds iterations
         else:
-            self.time += self.TIMESTEPPING_DT
+            dt = self.TIMESTEPPING_DT
+            self.time += dt
             if not self.auto_enabled and self.auto_enable_timer > 0.0:
                 self.auto_enable_timer -= self.TIMESTEPPING_DT
                 if self.auto_enable_timer <= 0.0:
                     self.mobile_agent.enabled = True
                     self.auto_enabled = True
             p.stepSimulation()
-            # TODO - log bullet states every 1200 iterations
 
-        self.info_id = Utilities.draw_debug_info(self.time, replaceItemUniqueId=self.info_id)
-
-        if not self.hide_ui:
-            self.read_ui()
         if self.use_interactive and self.mobile_agent.enabled:
             self.mobile_agent.drive.process_keyboard_events(normalize=True)
 
-        # self.monitor_buttons()
-        self.legos.step(self.mobile_agent.robot, self.mobile_agent.tower_link)
         self.mobile_agent.step()
+        # Buttons, legos, UI, debug info, LED, camera, rewind states, and
+        #  logs, each at its own rate
+        self.scheduler.run(self.time)
+        self.update_telemetry()
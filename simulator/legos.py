@@ -5,7 +5,8 @@ Last Modified:  Ammar on 11/26
 """
 
 import pybullet as p
-from typing import List, Tuple
+from typing import Any, Dict, List, Set, Tuple
+from xml.etree import ElementTree
 import re
 
 from simulator.utilities import Utilities
@@ -24,58 +25,94 @@ class Legos:
     """The height to spawn the blocks at"""
     SPAWN_HEIGHT = .3
 
+    """How close a block must come to the tower to be picked up"""
+    PICKUP_DISTANCE = .004
+
+    """The scale the lego URDF is loaded at"""
+    SCALE = .9
+
+    """The height collected blocks are parked at, out of sight under the field"""
+    PARK_HEIGHT = -1.0
+
+    # The parsed lego URDF, shared by every instance
+    _lego_urdf = None
+
     def __init__(self):
         """Creates an array of all the block ids to be populated.
         Right now there isn't much of a need for internal state, but when we 
         start keeping track of score this may expand.
         """
         self.block_ids : List[int] = []
+        # Same ids, for quick membership tests against broad-phase results
+        self.block_id_set : Set[int] = set()
+        # Blocks the robot collected, kept around so they can come back
+        self.parked_ids : List[int] = []
+        # The shared block shapes, created on the first load
+        self.shape_ids = None
 
     def __str__(self) -> str:
         """Prints out instance variables."""
-        return "(" + str(self.block_ids) + ")"
+        return "(" + str(self.block_ids) + ", " + str(self.parked_ids) + ")"
 
     def __repr__(self) -> str:
         """Returns `__str__` for easy debugging."""
         return str(self)
 
-    def load_lego_urdfs(self, blocks: List[Tuple[float, float, str]]) -> None:
+    def load_lego_urdfs(self, blocks: List[Tuple[float, float, float, str]]) -> None:
         """Loads the blocks specified in the list.
-        Takes in a list of x and y positions, as well as the rgb color to 
+        Takes in a list of x, y and z positions, as well as the rgb color to 
         make the blocks, and loads them upright into the play field. Also 
         does validation to make sure the blocks are in range, and throws an 
         exception if they are not.
 
-        :param blocks: a list of tuples of x, y, and rgb hex
+        All the blocks are validated before any is loaded. They share one 
+        collision and one visual shape, made from the lego URDF which is 
+        only parsed once, and are spawned with a single batched 
+        `createMultiBody` call. This keeps the setup time flat as the 
+        number of blocks grows.
+
+        :param blocks: a list of tuples of x, y, z, and rgb hex
         :raises ValueError: if the x or y is out of range or hex is invalid
         """
-
+        positions = []
+        colors = []
         for b in blocks:
-            # For readability
-            b_x = b[0]
-            b_y = b[1]
-            b_z = b[2]
-
             # Check that the color is valid with regex
             if re.match(r"#[0-9a-f]{6}", b[3]) == None:
                 raise ValueError("Must have valid rgb hex color")
             # Compute its color
             # We hard code the alpha as it must be exactly 0 or 1
             # From stackoverflow.com/questions/29643352/converting-hex-to-rgb-value-in-python
-            b_color = [int(b[3].lstrip('#')[i:i+2], 16) / 256 for i in (0,2,4)] + [1]
+            colors.append([int(b[3].lstrip('#')[i:i+2], 16) / 256 for i in (0,2,4)] + [1])
 
             # Check that it is valid
             # Basic sanity check that it is in bin area for now
-            # if abs(b_x) >= .682625 \
-            # or abs(b_y) >= .5715 \
-            # or abs(b_y) <= .2667:
+            # if abs(b[0]) >= .682625 \
+            # or abs(b[1]) >= .5715 \
+            # or abs(b[1]) <= .2667:
             #     raise ValueError("Center of lego block not in bin area")
 
-            # Load the block
-            b_id = p.loadURDF(
-                fileName = Utilities.gen_urdf_path("lego/lego.urdf"),
-                basePosition = [b_x, b_y, b_z],
-                globalScaling=0.9)
+            positions.append([b[0], b[1], b[2]])
+
+        if not positions:
+            return
+
+        # The shapes belong to the physics server, so make them once per 
+        #  simulation and reuse them for every later batch
+        if self.shape_ids is None:
+            self.shape_ids = Legos.create_lego_shapes()
+        collision_id, visual_id, mass, inertial_position = self.shape_ids
+
+        # Load the blocks
+        b_ids = p.createMultiBody(
+            baseMass = mass,
+            baseCollisionShapeIndex = collision_id,
+            baseVisualShapeIndex = visual_id,
+            basePosition = positions[0],
+            baseInertialFramePosition = inertial_position,
+            batchPositions = positions)
+
+        for b_id, b_color in zip(b_ids, colors):
             # Change its color with white specular
             p.changeVisualShape(
                 objectUniqueId = b_id,
@@ -92,9 +129,155 @@ class Legos:
 
             # Append the block id to the list we are maintaining
             self.block_ids.append(b_id)
+            self.block_id_set.add(b_id)
+
+    @staticmethod
+    def parse_lego_urdf() -> Dict[str, Any]:
+        """Reads the geometry and inertia out of the lego URDF.
+        The URDF is only parsed the first time, later calls return the 
+        same result. Lengths are already scaled by `SCALE`.
+
+        :return: the `collision` and `visual` shape lists, each a list of 
+            `(geometry type, half extents, radius, length, position)`, and 
+            the `mass` and `inertial_position` of the block
+        """
+        if Legos._lego_urdf is not None:
+            return Legos._lego_urdf
+
+        def read_shapes(tag):
+            shapes = []
+            for element in root.iter(tag):
+                position = [float(v) * Legos.SCALE 
+                            for v in element.find("origin").get("xyz").split()]
+                geometry = element.find("geometry")
+                box = geometry.find("box")
+                if box is not None:
+                    half_extents = [float(v) * Legos.SCALE / 2 for v in box.get("size").split()]
+                    shapes.append((p.GEOM_BOX, half_extents, 0, 0, position))
+                else:
+                    cylinder = geometry.find("cylinder")
+                    shapes.append((p.GEOM_CYLINDER, [0, 0, 0],
+                                   float(cylinder.get("radius")) * Legos.SCALE,
+                                   float(cylinder.get("length")) * Legos.SCALE,
+                                   position))
+            return shapes
+
+        root = ElementTree.parse(Utilities.gen_urdf_path("lego/lego.urdf")).getroot()
+        inertial = root.find("link").find("inertial")
+        Legos._lego_urdf = {
+            "collision": read_shapes("collision"),
+            "visual": read_shapes("visual"),
+            "mass": float(inertial.find("mass").get("value")),
+            "inertial_position": [float(v) * Legos.SCALE 
+                                  for v in inertial.find("origin").get("xyz").split()]
+        }
+        return Legos._lego_urdf
+
+    @staticmethod
+    def create_lego_shapes() -> Tuple[int, int, float, List[float]]:
+        """Creates the collision and visual shapes of a lego block.
+
+        :return: the collision shape id, visual shape id, mass, and 
+            inertial frame position to spawn blocks with
+        """
+        lego = Legos.parse_lego_urdf()
+        # pybullet only accepts lists here, tuples crash it
+        collision_types, collision_extents, collision_radii, \
+            collision_lengths, collision_positions = map(list, zip(*lego["collision"]))
+        visual_types, visual_extents, visual_radii, \
+            visual_lengths, visual_positions = map(list, zip(*lego["visual"]))
+        collision_id = p.createCollisionShapeArray(
+            shapeTypes = collision_types,
+            halfExtents = collision_extents,
+            radii = collision_radii,
+            lengths = collision_lengths,
+            collisionFramePositions = collision_positions)
+        visual_id = p.createVisualShapeArray(
+            shapeTypes = visual_types,
+            halfExtents = visual_extents,
+            radii = visual_radii,
+            lengths = visual_lengths,
+            visualFramePositions = visual_positions)
+        return collision_id, visual_id, lego["mass"], lego["inertial_position"]
+
+    def step(self, robot_id: int, robot_link_id: int) -> None:
+        """Picks up the blocks touching the robot's tower.
+        Only blocks whose bounding boxes overlap the tower's, grown by 
+        `PICKUP_DISTANCE`, go through the exact distance query. This way 
+        the cost scales with the number of nearby blocks, not all of them.
+
+        :param robot_id: the body id of the robot
+        :param robot_link_id: the link index of the robot's tower
+        """
+        aabb_min, aabb_max = p.getAABB(robot_id, robot_link_id)
+        overlapping = p.getOverlappingObjects(
+            [c - Legos.PICKUP_DISTANCE for c in aabb_min],
+            [c + Legos.PICKUP_DISTANCE for c in aabb_max])
+        # `None` when nothing overlaps
+        if not overlapping:
+            return
+
+        picked_ids = {b_id for b_id, _ in overlapping
+                      if b_id in self.block_id_set
+                      and len(p.getClosestPoints(robot_id, b_id, Legos.PICKUP_DISTANCE, 
+                                                 linkIndexA=robot_link_id)) > 0}
+        if not picked_ids:
+            return
+
+        for b_id in picked_ids:
+            self.park(b_id)
+
+    def park(self, b_id: int) -> None:
+        """Takes a collected block out of play without removing it.
+        Removing bodies would make `p.restoreState` fail and the block 
+        would have to be reloaded for the next episode. Instead, the block 
+        is frozen by making it static, stops colliding with anything, and 
+        is moved under the field.
+
+        :param b_id: the body id of a block in play
+        """
+        self.block_ids.remove(b_id)
+        self.block_id_set.remove(b_id)
+        p.changeDynamics(b_id, -1, mass=0)
+        p.setCollisionFilterGroupMask(b_id, -1, 0, 0)
+        p.resetBasePositionAndOrientation(b_id, [0, 0, Legos.PARK_HEIGHT], [0, 0, 0, 1])
+        self.parked_ids.append(b_id)
 
-    def step(self, robot_id, robot_link_id):
-        for lego_id in self.block_ids:
-            if len(p.getClosestPoints(robot_id, lego_id, 0.004, linkIndexA=robot_link_id)) > 0:
-                self.block_ids.remove(lego_id)
-                p.removeBody(lego_id)
+    def unpark(self, b_id: int) -> None:
+        """Puts a parked block back into play where it currently is.
+
+        :param b_id: the body id of a parked block
+        """
+        p.changeDynamics(b_id, -1, mass=Legos.parse_lego_urdf()["mass"])
+        # The default filter of dynamic bodies, collide with everything
+        p.setCollisionFilterGroupMask(b_id, -1, 1, -1)
+        self.parked_ids.remove(b_id)
+        self.block_ids.append(b_id)
+        self.block_id_set.add(b_id)
+
+    def reset(self) -> None:
+        """Brings every parked block back into play.
+        Their poses are not touched, call this after `p.restoreState` has 
+        put them back where they started.
+        """
+        for b_id in list(self.parked_ids):
+            self.unpark(b_id)
+
+    def get_state(self) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        """Returns which blocks are in play and which are parked.
+        The ids are sorted, as parking and unparking change their order.
+        """
+        return tuple(sorted(self.block_ids)), tuple(sorted(self.parked_ids))
+
+    def set_state(self, state: Tuple[Tuple[int, ...], Tuple[int, ...]]) -> None:
+        """Parks and unparks blocks to match a state from `get_state()`.
+        Like `reset()`, this is meant to follow `p.restoreState`, which 
+        restores poses but not the dynamics of parked blocks.
+
+        :param state: the block ids in play and parked
+        """
+        block_ids, parked_ids = state
+        for b_id in [b_id for b_id in self.parked_ids if b_id in block_ids]:
+            self.unpark(b_id)
+        for b_id in [b_id for b_id in self.block_ids if b_id in parked_ids]:
+            self.park(b_id)
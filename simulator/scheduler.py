@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+File:          scheduler.py
+Author:        Binit Shah
+Last Modified: Binit on 10/18
+"""
+
+import collections
+
+class ScheduledTask:
+    """A callback the Scheduler runs every `period` sim seconds"""
+    def __init__(self, period, callback, time):
+        """Schedules the first run at `time`.
+
+        :param period:   sim seconds between runs, 0 runs every step.
+        :param callback: called with the sim seconds since its last run.
+        :param time:     the current sim time.
+        """
+        self.period = period
+        self.callback = callback
+        self.last_time = time
+        self.next_time = time
+
+class Scheduler:
+    """Runs the subsystems of the game at their own rates in sim time
+
+    Logic that changes slowly compared to the 240 Hz physics, like
+    debouncing 25 ms button presses or redrawing the clock, registers
+    the period it needs and only runs when it is due. Tasks run in the
+    order they were registered.
+    """
+
+    # Slack for sim times that add up to a due time with rounding error
+    EPSILON = 1e-9
+
+    def __init__(self, time=0.0):
+        """Starts with no tasks.
+
+        :param time: the current sim time.
+        """
+        self.time = time
+        self.tasks = collections.OrderedDict()
+
+    def register(self, name, period, callback):
+        """Adds a task, it first runs on the next call to `run()`.
+
+        :param name:     the name of the task.
+        :param period:   sim seconds between runs, 0 runs every step.
+        :param callback: called with the sim seconds since its last run.
+        :raises ValueError: if the name is taken or the period is negative.
+        """
+        if name in self.tasks:
+            raise ValueError("a task named {} is already registered".format(name))
+        if period < 0.0:
+            raise ValueError("the period of {} must not be negative".format(name))
+        self.tasks[name] = ScheduledTask(period, callback, self.time)
+
+    def unregister(self, name):
+        """Removes a task.
+
+        :param name: the name of the task.
+        :raises KeyError: if there is no task with that name.
+        """
+        del self.tasks[name]
+
+    def set_period(self, name, period):
+        """Changes how often a task runs, starting after its next run.
+
+        :param name:   the name of the task.
+        :param period: sim seconds between runs, 0 runs every step.
+        :raises KeyError: if there is no task with that name.
+        """
+        self.tasks[name].period = period
+
+    def restart(self, name, time):
+        """Starts a task's cadence over, as if it had just run at `time`.
+        For when its work was done outside of the scheduler.
+
+        :param name: the name of the task.
+        :param time: the sim time it counts as having run at.
+        :raises KeyError: if there is no task with that name.
+        """
+        task = self.tasks[name]
+        task.last_time = time
+        task.next_time = time + task.period
+
+    def reset(self, time):
+        """Makes every task due, e.g. after the sim time was set.
+
+        :param time: the current sim time.
+        """
+        self.time = time
+        for task in self.tasks.values():
+            task.last_time = time
+            task.next_time = time
+
+    def run(self, time):
+        """Runs the tasks that are due.
+
+        :param time: the current sim time.
+        """
+        if time < self.time:
+            # The sim went back in time, e.g. a reset or rewind
+            self.reset(time)
+        self.time = time
+        for task in self.tasks.values():
+            if time + self.EPSILON < task.next_time:
+                continue
+            task.callback(time - task.last_time)
+            task.last_time = time
+            # Keep a steady cadence, but don't try to catch up on missed runs
+            task.next_time = max(task.next_time + task.period, time)
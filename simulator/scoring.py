@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+File:          scoring.py
+Author:        Binit Shah
+Last Modified: Binit on 10/18
+"""
+
+import heapq
+import itertools
+from collections import namedtuple
+from typing import Iterable, Optional, Tuple
+
+from simulator.buttons import Buttons
+
+
+"""Slack in seconds for times that add up to the same moment with rounding error."""
+EPSILON : float = 1e-9
+
+# `Buttons.PI_DIGITS` as Python ints, which are quicker to index one at a time
+_PI_DIGITS : Tuple[int, ...] = tuple(Buttons.PI_DIGITS.tolist())
+
+
+class Score(namedtuple('Score', ['num_sequenced', 'extra_not_sequenced', 'in_sequence'])):
+    """The result of scoring a timeline, like the scoring state of `Buttons`."""
+    __slots__ = ()
+
+    @property
+    def points(self) -> int:
+        """The points scored, `10 * num_sequenced + min(extra_not_sequenced, 100)`."""
+        return 10*self.num_sequenced + min(self.extra_not_sequenced, 100)
+
+
+def score_timeline(events: Iterable[Tuple[float, int, bool]],
+                   num_buttons: int = 10,
+                   end_time: Optional[float] = None) -> Score:
+    """Scores a timeline of button presses without simulating the field.
+
+    Gives the score `Buttons` would reach if its readings followed the
+    timeline and it was updated with infinitely small timesteps. Rather
+    than stepping time, it jumps between the moments something happens:
+
+    - A reading changes at an event. This restarts the button's debounce,
+      so if it now differs from the button's state, the state changes
+      `Buttons.DEBOUNCE_DELAY` later, unless the reading changes again
+      first.
+    - The states change when a debounce delay ends. Every state change at
+      the same moment is scored together, like one pass of `loop()` in
+      `ArenaControl.ino`.
+
+    Flashing LEDs are not simulated, as they don't affect the score. Events
+    for a button that don't change its reading are ignored.
+
+    :param events: `(time, button, pressed)` tuples in seconds, sorted by
+        time or not
+    :param int num_buttons: the number of buttons on the wall
+    :param end_time: the time to stop scoring at, after every delay has
+        ended when `None`
+    :return: the `Score` at the end of the timeline
+    :raises IndexError: if an event's button is out of range
+    """
+    readings = [False] * num_buttons
+    states = [False] * num_buttons
+    # When each button's pending state change happens, `None` if it has none
+    due = [None] * num_buttons
+    # `(time, button)` of the pending state changes, possibly outdated
+    pending = []
+
+    in_sequence = True
+    num_sequenced = 0
+    extra_not_sequenced = 0
+    num_pressed = 0
+    num_digits = len(_PI_DIGITS)
+
+    def settle(until):
+        """Scores the state changes happening before `until`."""
+        nonlocal in_sequence, num_sequenced, extra_not_sequenced, num_pressed
+        # A change due at `until` hasn't happened yet, as the debounce 
+        #  check is a strict greater than
+        while pending and (until is None or pending[0][0] < until - EPSILON):
+            time = pending[0][0]
+            # `debounceButtons()` for every button changing at this moment
+            new_press = False
+            while pending and pending[0][0] == time:
+                _, b = heapq.heappop(pending)
+                if due[b] != time:
+                    # Outdated, the reading changed again before the delay ended
+                    continue
+                due[b] = None
+                states[b] = readings[b]
+                if states[b]:
+                    new_press = True
+                    num_pressed += 1
+                else:
+                    num_pressed -= 1
+
+            # Logic in the second half of `loop()`, no LEDs
+            if num_pressed == 0:
+                pass
+            elif in_sequence:
+                if num_pressed > 1:
+                    in_sequence = False
+                elif new_press:
+                    # Past the last digit, no press is in sequence
+                    digit = _PI_DIGITS[num_sequenced] if num_sequenced < num_digits else -1
+                    if not 0 <= digit < num_buttons or not states[digit]:
+                        in_sequence = False
+                        extra_not_sequenced += 1
+                    else:
+                        num_sequenced += 1
+            elif new_press:
+                extra_not_sequenced += 1
+
+    # Only the last reading of a button at any one moment is seen, a
+    #  press and release at the same time never happened
+    for time, group in itertools.groupby(sorted(events, key=lambda e: e[0]), key=lambda e: e[0]):
+        if end_time is not None and time > end_time:
+            break
+        settle(time)
+        for b, pressed in {b: bool(pressed) for _, b, pressed in group}.items():
+            if not 0 <= b < num_buttons:
+                raise IndexError("we must have 0 <= `button` < `num_buttons`")
+            if pressed == readings[b]:
+                continue
+            readings[b] = pressed
+            if readings[b] != states[b]:
+                due[b] = time + Buttons.DEBOUNCE_DELAY
+                heapq.heappush(pending, (due[b], b))
+            else:
+                # Back to its state before the delay ended, nothing changes
+                due[b] = None
+
+    settle(end_time)
+    return Score(num_sequenced, extra_not_sequenced, in_sequence)
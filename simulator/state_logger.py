@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+File:          state_logger.py
+Author:        Binit Shah
+Last Modified: Binit on 10/18
+"""
+
+import os
+import sys
+import queue
+import shutil
+import tempfile
+import threading
+import traceback
+import pybullet as p
+
+class StateLogger:
+    """Logs restorable .bullet states without stalling the simulation
+
+    pybullet serializes the world quickly, writing the file to the log
+    folder is what can take long. So states are saved to a memory backed
+    staging folder from the simulation thread, and a background thread
+    moves them into the log folder. When the writer falls too far
+    behind, new states are dropped instead of blocking the simulation.
+    """
+    def __init__(self, log_dir, max_pending=4):
+        """Starts the background writer.
+
+        :param log_dir:     the directory the .bullet files end up in.
+        :param max_pending: how many states may wait for the writer before
+                            new ones are dropped.
+        """
+        self.log_dir = log_dir
+        os.makedirs(self.log_dir, exist_ok=True)
+        # /dev/shm is memory backed on Linux, elsewhere use the temp folder
+        self.staging_dir = tempfile.mkdtemp(prefix="sim_states_",
+                                            dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        self.num_dropped = 0
+        self.num_failed = 0
+
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.writer = threading.Thread(target=self._write_states, daemon=True)
+        self.writer.start()
+
+    def log(self, fname):
+        """Captures the current state, to be written as `fname` in the log folder.
+
+        :param fname: the name of the .bullet file.
+        :return:      whether the state was queued, False when it was dropped.
+        """
+        if self.pending.full():
+            self.num_dropped += 1
+            return False
+        staging_fname = os.path.join(self.staging_dir, fname)
+        p.saveBullet(staging_fname)
+        self.pending.put_nowait(staging_fname)
+        return True
+
+    def _write_states(self):
+        """Moves staged states into the log folder until told to stop.
+        A state that can't be written, e.g. when the disk is full, is
+        reported and skipped so the following ones are still written.
+        """
+        while True:
+            staging_fname = self.pending.get()
+            if staging_fname is None:
+                break
+            try:
+                shutil.move(staging_fname, os.path.join(self.log_dir, os.path.basename(staging_fname)))
+            except Exception:
+                self.num_failed += 1
+                traceback.print_exc()
+            self.pending.task_done()
+
+    def close(self):
+        """Waits for the queued states to be written, then stops the writer.
+        Reports how many states were dropped or failed to be written.
+        """
+        self.pending.put(None)
+        self.writer.join()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        if self.num_dropped or self.num_failed:
+            print("StateLogger: {} states dropped, {} failed to be written to {}".format(
+                      self.num_dropped, self.num_failed, self.log_dir),
+                  file=sys.stderr)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+File:          telemetry.py
+Author:        Binit Shah
+Last Modified: Binit on 10/18
+"""
+
+import struct
+import numpy as np
+
+# One row per recorded step. Wheel velocities are (left, right) like
+#  BlockStackerAgent.read_wheel_velocities(), target velocities too
+TELEMETRY_DTYPE = np.dtype([("time", np.float64),
+                            ("position", np.float64, (3,)),
+                            ("orientation", np.float64, (4,)),
+                            ("wheel_vels", np.float64, (2,)),
+                            ("target_vels", np.float64, (2,)),
+                            ("enabled", np.bool_),
+                            ("legos", np.int32)])
+
+class TelemetryRecorder:
+    """Records the robot's trajectory to a .npy file, one row per step
+
+    Rows are written into a preallocated chunk, and a full chunk is
+    appended to the file in a single write, so recording a step costs
+    a few array assignments. The file is a structured .npy array with
+    the columns of TELEMETRY_DTYPE. Load it with
+    `np.load(fname, mmap_mode="r")` to slice long runs without reading
+    all of it, e.g. `trace["position"][:, :2]`.
+    """
+    def __init__(self, fname, chunk_size=4096):
+        """Opens the file and writes a placeholder header.
+
+        :param fname:      the .npy file to write.
+        :param chunk_size: how many rows to buffer before writing them.
+        """
+        self.fname = fname
+        self.chunk = np.zeros(chunk_size, dtype=TELEMETRY_DTYPE)
+        self.num_buffered = 0
+        self.num_rows = 0
+
+        # Room for the header of the most rows a file can hold, so it is
+        #  always rewritten in place without moving the rows after it
+        self.header_size = len(self._header(np.iinfo(np.int64).max))
+        self.file = open(fname, "wb")
+        self._write_header()
+
+    def _header(self, num_rows, header_size=0):
+        """Builds a version 1.0 .npy header, padded to `header_size` bytes."""
+        header = repr({"descr": np.lib.format.dtype_to_descr(TELEMETRY_DTYPE),
+                       "fortran_order": False,
+                       "shape": (num_rows,)}).encode("latin1")
+        prefix_size = len(np.lib.format.magic(1, 0)) + 2
+        # Pad with spaces and end with a newline, keeping the rows 64 byte 
+        #  aligned like numpy does
+        total_size = max(header_size, -(-(prefix_size + len(header) + 1) // 64) * 64)
+        header += b" " * (total_size - prefix_size - len(header) - 1) + b"\n"
+        return np.lib.format.magic(1, 0) + struct.pack("<H", len(header)) + header
+
+    def _write_header(self):
+        """(Re)writes the .npy header for the rows written so far."""
+        self.file.seek(0)
+        self.file.write(self._header(self.num_rows, self.header_size))
+        self.file.seek(0, 2)
+
+    def record(self, time, position, orientation, wheel_vels, target_vels, enabled, legos):
+        """Buffers one row, and writes out the chunk once it is full.
+
+        :param time:        the sim time.
+        :param position:    the robot's base position in meters.
+        :param orientation: the robot's base orientation quaternion.
+        :param wheel_vels:  the measured (left, right) wheel velocities.
+        :param target_vels: the commanded (left, right) wheel velocities.
+        :param enabled:     whether the robot is enabled.
+        :param legos:       how many legos the robot has collected.
+        """
+        row = self.chunk[self.num_buffered]
+        row["time"] = time
+        row["position"] = position
+        row["orientation"] = orientation
+        row["wheel_vels"] = wheel_vels
+        row["target_vels"] = target_vels
+        row["enabled"] = enabled
+        row["legos"] = legos
+        self.num_buffered += 1
+        if self.num_buffered == len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows and updates the header to include them."""
+        if self.num_buffered == 0:
+            return
+        self.file.write(self.chunk[:self.num_buffered].tobytes())
+        self.num_rows += self.num_buffered
+        self.num_buffered = 0
+        self._write_header()
+        self.file.flush()
+
+    def close(self):
+        """Writes the remaining rows and closes the file."""
+        self.flush()
+        self.file.close()
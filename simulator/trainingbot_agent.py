@@ -8,15 +8,20 @@ Last Modified: Binit on 2/20
 import pybullet as p
 
 from simulator.utilities import Utilities
+from simulator.camera import CameraConfig
 
 class TrainingBotAgent:
     """The TrainingBotAgent class maintains the trainingbot agent"""
-    def __init__(self, motion_delta=0.5, skew=0.0):
+    def __init__(self, motion_delta=0.5, skew=0.0, camera_config=None):
         """Setups infomation about the agent
+
+        :param camera_config: the CameraConfig of the robot camera,
+                              defaults to 300x300 frames.
         """
         self.camera_link = 15
         self.caster_links = [12, 13]
         self.motor_links = [3, 8]
+        self.camera = camera_config if camera_config else CameraConfig()
 
         # Differential motor control
         self.max_force = 1
@@ -83,20 +88,15 @@ class TrainingBotAgent:
         self.ltarget_vel = ltarget_vel
         return self.read_wheel_velocities()
 
-    def capture_image(self):
-        # Camera
+    def capture_image(self, out=None, alpha=True):
+        """Renders the robot camera.
+
+        :param out:   optional (height, width, 4|3) uint8 array to render into.
+        :param alpha: whether to keep the alpha channel when `out` is None.
+        :return:      the contiguous (height, width, 4|3) uint8 image.
+        """
         *_, camera_position, camera_orientation = p.getLinkState(self.robot, self.camera_link)
-        camera_look_position, _ = p.multiplyTransforms(camera_position, camera_orientation, [0,0.1,0], [0,0,0,1])
-        view_matrix = p.computeViewMatrix(
-          cameraEyePosition=camera_position,
-          cameraTargetPosition=camera_look_position,
-          cameraUpVector=(0, 0, 1))
-        projection_matrix = p.computeProjectionMatrixFOV(
-          fov=45.0,
-          aspect=1.0,
-          nearVal=0.1,
-          farVal=3.1)
-        return p.getCameraImage(300, 300, view_matrix, projection_matrix, renderer=p.ER_BULLET_HARDWARE_OPENGL)[2]
+        return self.camera.render(camera_position, camera_orientation, out=out, alpha=alpha)
 
     def step(self):
         p.setJointMotorControlArray(self.robot, self.motor_links, p.VELOCITY_CONTROL,
@@ -66,6 +66,17 @@ class Utilities:
 
         return m_uid
 
+    def camera_image_to_array(pixels, width, height, out=None, alpha=True):
+        '''Turn the rgb pixels of getCameraImage into a contiguous (height, width, 4|3) uint8 array.
+        Avoids a copy when pybullet was built with NumPy. When given, the pixels are written
+        into `out`, whose channel count chooses between RGBA and RGB.
+        '''
+        rgba = np.asarray(pixels, dtype=np.uint8).reshape(height, width, 4)
+        if out is not None:
+            out[...] = rgba[..., :out.shape[2]]
+            return out
+        return np.ascontiguousarray(rgba if alpha else rgba[..., :3])
+
     def print_multibody_links(body_id):
         for link_id in range(p.getNumJoints(body_id)):
             print(p.getJointInfo(body_id, link_id))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+File:          video_recorder.py
+Author:        Binit Shah
+Last Modified: Binit on 10/18
+"""
+
+import shutil
+import subprocess
+import multiprocessing
+import pybullet as p
+
+from simulator.frame_ring import FrameRing
+from simulator.utilities import Utilities
+
+def _encode_frames(fname, frame_ring_name, num_frames, frame_shape, fps, slots, free_slots):
+    """Encoder process, pipes the frames it is told about into ffmpeg."""
+    frames = FrameRing(num_frames, frame_shape, name=frame_ring_name)
+    height, width, _ = frame_shape
+    ffmpeg = subprocess.Popen([shutil.which("ffmpeg"), "-y", "-loglevel", "error",
+                               "-f", "rawvideo", "-pix_fmt", "rgba",
+                               "-s", "{}x{}".format(width, height), "-r", str(fps),
+                               "-i", "-",
+                               "-pix_fmt", "yuv420p", "-vcodec", "libx264", fname],
+                              stdin=subprocess.PIPE)
+    while True:
+        slot = slots.get()
+        if slot is None:
+            break
+        ffmpeg.stdin.write(frames.frames[slot].tobytes())
+        free_slots.release()
+    ffmpeg.stdin.close()
+    ffmpeg.wait()
+    frames.close()
+
+class VideoRecorder:
+    """Records an mp4 of the field without a GUI
+
+    Frames are rendered from a fixed overview camera into a ring of
+    shared memory buffers, and a separate process encodes them with
+    ffmpeg. The simulation only pays for rendering. When the encoder
+    falls behind and every buffer is taken, frames are dropped instead
+    of waiting for it.
+    """
+    def __init__(self, fname, topdown=False, width=640, height=480, fps=30.0, num_frames=16):
+        """Starts the encoder process.
+
+        :param fname:      the mp4 file to write.
+        :param topdown:    view the field from the top, like the topdown viewport,
+                           instead of the default viewport's angle.
+        :param width:      the width of the video, must be even.
+        :param height:     the height of the video, must be even.
+        :param fps:        frames per simulated second.
+        :param num_frames: how many frames may wait for the encoder.
+        :raises RuntimeError: if ffmpeg is not installed.
+        """
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError("headless mp4 logging needs ffmpeg on the PATH")
+
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.num_dropped = 0
+        if topdown:
+            self.view_matrix = p.computeViewMatrixFromYawPitchRoll((0.0, 0.0, 0.0), 1.1, 0.0, -89.9, 0.0, 2)
+        else:
+            self.view_matrix = p.computeViewMatrixFromYawPitchRoll((0.0, 0.2, 0.0), 2, 30.0, -50.0, 0.0, 2)
+        self.projection_matrix = p.computeProjectionMatrixFOV(fov=60.0, aspect=width / height,
+                                                              nearVal=0.01, farVal=10.0)
+
+        self.frames = FrameRing(num_frames, (height, width, 4))
+        self.slots = multiprocessing.Queue()
+        self.free_slots = multiprocessing.Semaphore(num_frames)
+        self.encoder = multiprocessing.Process(target=_encode_frames,
+                                               args=(fname, self.frames.name, num_frames,
+                                                     self.frames.frame_shape, fps,
+                                                     self.slots, self.free_slots))
+        self.encoder.start()
+
+    def record(self):
+        """Renders one frame and hands it to the encoder.
+
+        :return: whether the frame was recorded, False when it was dropped.
+        """
+        if not self.free_slots.acquire(block=False):
+            self.num_dropped += 1
+            return False
+        slot, _ = self.frames.next_slot()
+        pixels = p.getCameraImage(self.width, self.height, self.view_matrix, self.projection_matrix)[2]
+        Utilities.camera_image_to_array(pixels, self.width, self.height, out=self.frames.frames[slot])
+        self.slots.put(slot)
+        return True
+
+    def close(self):
+        """Waits for the encoder to finish the video."""
+        self.slots.put(None)
+        self.encoder.join()
+        self.frames.close()
@@ -1 +1 @@
-from simulator.Pistons import Pistons
\ No newline at end of file
+from simulator.pistons import Pistons
\ No newline at end of file
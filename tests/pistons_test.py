@@ -1,4 +1,4 @@
-from simulator import Pistons
+from simulator import pistons as Pistons
 
 def test_start():
     piston_length = 10
@@ -0,0 +1,88 @@
+"""
+File:			test_bin_configuration.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import os
+import tempfile
+import unittest
+
+from simulator.bin_configuration import BinConfiguration
+from simulator.utilities import Utilities
+
+
+class BinConfigurationTest(unittest.TestCase):
+	"""A class to unit test `BinConfiguration`.
+
+	Writes small configurations to a temporary directory and checks 
+	what gets loaded from them, as well as the caching.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Starts every test with an empty cache and directory.
+		"""
+		BinConfiguration.clear_cache()
+		self.dir = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		"""Overloaded method of `TestCase`.
+
+		Cleans up the temporary directory.
+		"""
+		self.dir.cleanup()
+
+	def write(self, name, contents):
+		"""Writes a configuration file and returns its path."""
+		fname = os.path.join(self.dir.name, name)
+		with open(fname, 'w') as f:
+			f.write(contents)
+		return fname
+
+	def test_load(self):
+		"""Loads the blocks of every bin, in order.
+
+		Missing heights fall back to the default, and colors are made 
+		lowercase.
+		"""
+		fname = self.write('bins.yaml',
+			'bins:\n'
+			'  left:\n'
+			'    - {x: -0.4, y: -0.3, color: "#FF0000"}\n'
+			'    - {x: -0.4, y: -0.35, z: 0.15, color: "#00ffff"}\n'
+			'  right:\n')
+		self.assertEqual(BinConfiguration.load(fname), [
+			(-0.4, -0.3, BinConfiguration.DEFAULT_HEIGHT, "#ff0000"),
+			(-0.4, -0.35, 0.15, "#00ffff")])
+
+	def test_cache(self):
+		"""Identical files share a cache entry, edited ones do not."""
+		contents = 'bins:\n  left:\n    - {x: 0, y: 0, color: "#000000"}\n'
+		first = self.write('first.yaml', contents)
+		second = self.write('second.yaml', contents)
+		BinConfiguration.load(first)
+		BinConfiguration.load(second)
+		self.assertEqual(len(BinConfiguration._cache), 1)
+
+		self.write('first.yaml', contents.replace('x: 0', 'x: 1'))
+		self.assertEqual(BinConfiguration.load(first)[0][0], 1.0)
+		self.assertEqual(len(BinConfiguration._cache), 2)
+
+	def test_invalid(self):
+		"""Malformed configurations are rejected."""
+		for contents in ['- 1\n',
+		                 'bins:\n  left:\n    - {x: 0, color: "#000000"}\n',
+		                 'bins:\n  left:\n    - {x: 0, y: 0, color: "red"}\n']:
+			with self.assertRaises(ValueError):
+				BinConfiguration.parse(contents)
+
+	def test_default(self):
+		"""The default layout `Game` loads is the single block."""
+		self.assertEqual(BinConfiguration.load(Utilities.gen_urdf_path('bins/default.yaml')),
+		                 [(0.0, -0.3, 0.1, '#00ffff')])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -4,9 +4,10 @@ Author:			Ammar Ratnani
 Last Modified:	Ammar on 9/26
 """
 
+import random
 import unittest
 
-from simulator.Buttons import *
+from simulator.buttons import *
 
 
 class ButtonsTest(unittest.TestCase):
@@ -81,11 +82,10 @@ class ButtonsTest(unittest.TestCase):
 			self.bs.update_buttons(.03) # Anything > .025
 
 		self.assertEqual(self.bs.num_sequenced, 0)
-                # For some reason, even though we do this 1000 times, 
-                # only 999 of them count. I looked over the code, and 
-                # Arduino code seems to have this too. As such, I 
-                # count it a success, but I want to discuss it.
-		self.assertEqual(self.bs.extra_not_sequenced, 999)
+		# Every press counts. The first one is the wrong digit, as 3 is 
+		#  expected, so it counts as extra and ends the sequence, like 
+		#  the other 999 that come after it.
+		self.assertEqual(self.bs.extra_not_sequenced, 1000)
 		self.assertFalse(self.bs.in_sequence)
 
 		# Make sure the buttons are cleared
@@ -94,6 +94,207 @@ class ButtonsTest(unittest.TestCase):
 			self.assertFalse(b.last_button_state)
 			self.assertFalse(b.reading)
 
+	def test_expected_button(self):
+		"""Follows the expected button through and past the digits of PI.
+
+		Once every digit is sequenced there is no expected button, and 
+		further presses are out of sequence instead of failing.
+		"""
+		self.assertEqual(list(Buttons.PI_DIGITS[:5]), [3, 1, 4, 1, 5])
+		self.assertEqual(self.bs.expected_button, 3)
+		self.bs.press_button(3)
+		self.bs.update_buttons(.03)
+		self.bs.unpress_button(3)
+		self.bs.update_buttons(.03)
+		self.assertEqual(self.bs.expected_button, 1)
+		self.assertTrue(self.bs.button_status(1).lit)
+
+		self.bs.num_sequenced = len(Buttons.PI)
+		self.assertEqual(self.bs.expected_button, -1)
+		self.bs.press_button(0)
+		self.bs.update_buttons(.03)
+		self.assertEqual(self.bs.extra_not_sequenced, 1)
+		self.assertFalse(self.bs.in_sequence)
+
+	def test_apply_readings(self):
+		"""Reads the buttons from joint positions.
+
+		Presses the first digits of PI by moving their joints below 
+		the threshold, one update per reading like `Game` does.
+		"""
+		for d in map(int, Buttons.PI[:20]):
+			positions = [0.0] * 10
+			positions[d] = -.005
+			self.bs.apply_readings(positions, -.0038, .03)
+			self.bs.apply_readings(positions, -.0038, .03)
+			self.bs.apply_readings([0.0] * 10, -.0038, .03)
+			self.bs.apply_readings([0.0] * 10, -.0038, .03)
+
+		self.assertEqual(self.bs.num_sequenced, 20)
+		self.assertEqual(self.bs.extra_not_sequenced, 0)
+		self.assertTrue(self.bs.in_sequence)
+
+		with self.assertRaises(ValueError):
+			self.bs.apply_readings([0.0] * 9, -.0038, .03)
+
+
+class ReferenceButtons:
+	"""The scalar loop `Buttons.update_buttons()` ran before `ButtonBank`.
+
+	Kept as a reference for one field, with the state of every button in 
+	plain lists, so the vectorized bank can be checked against it.
+	"""
+
+	def __init__(self, num_buttons: int = 10):
+		self.reading : List[bool] = [False] * num_buttons
+		self.last_button_state : List[bool] = [False] * num_buttons
+		self.button_state : List[bool] = [False] * num_buttons
+		self.last_debounce_time : List[float] = [0.0] * num_buttons
+		self.lit : List[bool] = [False] * num_buttons
+		self.in_sequence : bool = True
+		self.num_sequenced : int = 0
+		self.extra_not_sequenced : int = 0
+		self.time : float = 0.0
+		self.flash_timeout : float = 0.0
+		self.lit[int(Buttons.PI[0])] = True
+
+	def flash(self) -> None:
+		"""`flashAllLEDs()`"""
+		self.lit = [True] * len(self.lit)
+		self.flash_timeout = self.time + Buttons.FLASH_INTERVAL
+
+	def update_buttons(self, dt: float) -> None:
+		self.time += dt
+		new_press = False
+		num_pressed = 0
+
+		if self.flash_timeout != 0.0 and self.time > self.flash_timeout:
+			self.lit = [False] * len(self.lit)
+
+		for i in range(len(self.reading)):
+			if self.reading[i] != self.last_button_state[i]:
+				self.last_debounce_time[i] = self.time
+			if (self.time - self.last_debounce_time[i]) > Buttons.DEBOUNCE_DELAY:
+				if self.reading[i] != self.button_state[i]:
+					self.button_state[i] = self.reading[i]
+					if self.button_state[i]:
+						new_press = True
+			if self.button_state[i]:
+				num_pressed += 1
+			self.last_button_state[i] = self.reading[i]
+
+		if num_pressed == 0:
+			pass
+		elif self.in_sequence:
+			if num_pressed > 1:
+				self.in_sequence = False
+				self.flash()
+			elif new_press:
+				digit = int(Buttons.PI[self.num_sequenced])
+				if not self.button_state[digit]:
+					self.in_sequence = False
+					self.extra_not_sequenced += 1
+					self.flash()
+				else:
+					self.lit[digit] = False
+					self.num_sequenced += 1
+					self.lit[int(Buttons.PI[self.num_sequenced])] = True
+		elif new_press:
+			self.extra_not_sequenced += 1
+			self.flash()
+
+
+class ButtonBankTest(unittest.TestCase):
+	"""A class to unit test `ButtonBank`.
+
+	Plays different games on the fields of one bank, and checks that 
+	each field scores exactly like the scalar `ReferenceButtons` would.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Run before any of the unit tests.
+		"""
+		self.bank : ButtonBank = ButtonBank(3)
+		self.refs : List[ReferenceButtons] = [ReferenceButtons() for _ in range(3)]
+
+	def update(self, dt):
+		"""Updates the bank and the references by the same time."""
+		self.bank.update_buttons(dt)
+		for f, r in enumerate(self.refs):
+			r.update_buttons(dt[f] if isinstance(dt, list) else dt)
+
+	def set_reading(self, f, d, pressed):
+		"""Sets the reading of a button on the bank and its reference."""
+		self.bank.reading[f, d] = pressed
+		self.refs[f].reading[d] = pressed
+
+	def assertMatches(self):
+		"""Checks every field of the bank against its reference."""
+		for f, r in enumerate(self.refs):
+			self.assertEqual(self.bank.num_sequenced[f], r.num_sequenced)
+			self.assertEqual(self.bank.extra_not_sequenced[f], r.extra_not_sequenced)
+			self.assertEqual(self.bank.in_sequence[f], r.in_sequence)
+			self.assertEqual(list(self.bank.button_state[f]), r.button_state)
+			self.assertEqual(list(self.bank.lit[f]), r.lit)
+			self.assertAlmostEqual(self.bank.flash_timeout[f], r.flash_timeout)
+
+	def press(self, presses):
+		"""Presses a button on each field, `None` to press nothing."""
+		for pressed in (True, False):
+			for f, d in enumerate(presses):
+				if d is not None:
+					self.set_reading(f, d, pressed)
+			# Like `press_button()`, the reading is seen before time passes
+			self.update(0.0)
+			self.update(.03) # Anything > .025
+			self.assertMatches()
+
+	def test_independent_fields(self):
+		"""Sequences PI on one field, spams on one, and idles on one."""
+		for d in map(int, Buttons.PI[:50]):
+			self.press([d, 1, None])
+
+		self.assertEqual(list(self.bank.num_sequenced), [50, 0, 0])
+		self.assertEqual(list(self.bank.extra_not_sequenced), [0, 50, 0])
+		self.assertEqual(list(self.bank.in_sequence), [True, False, True])
+
+	def test_multiple_pressed(self):
+		"""Pressing two buttons at once ends the sequence on that field only."""
+		self.set_reading(0, 3, True)
+		self.set_reading(0, 4, True)
+		self.set_reading(1, 3, True)
+		self.update(0.0)
+		self.update(.03)
+		self.update(.03)
+		self.assertMatches()
+
+		self.assertEqual(list(self.bank.in_sequence), [False, True, True])
+		self.assertEqual(list(self.bank.num_sequenced), [0, 1, 0])
+		self.assertTrue(self.bank.lit[0].all())
+
+	def test_random_play(self):
+		"""Random presses and timesteps, mostly of the expected digit."""
+		rng = random.Random(2718)
+		for _ in range(3000):
+			for f, r in enumerate(self.refs):
+				if rng.random() > .2:
+					continue
+				if any(r.reading) and rng.random() < .9:
+					# Usually let go before the next press
+					self.set_reading(f, r.reading.index(True), False)
+				elif rng.random() < .8:
+					self.set_reading(f, int(Buttons.PI[r.num_sequenced]), True)
+				else:
+					self.set_reading(f, rng.randrange(10), True)
+			self.update([rng.choice([0.0, .005, .01, .03]) for _ in self.refs])
+			self.assertMatches()
+
+		# Make sure the game got far enough to mean something
+		self.assertGreater(max(r.num_sequenced for r in self.refs), 0)
+		self.assertGreater(max(r.extra_not_sequenced for r in self.refs), 0)
+
 
 
 if __name__ == '__main__':
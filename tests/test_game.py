@@ -0,0 +1,100 @@
+"""
+File:			test_game.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import unittest
+
+import pybullet as p
+
+from simulator.game import Game
+
+
+class GameStateTest(unittest.TestCase):
+	"""A class to unit test restoring earlier states of a `Game`.
+
+	Runs a headless game, has the robot collect the block by dropping it 
+	onto the tower, and checks that going back to before the pickup 
+	brings the block back into play.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Sets up a headless game with the default single block.
+		"""
+		self.g : Game = Game(use_interactive=False, is_interactive_realtime=False,
+		                     rewind_interval=.05)
+		self.g.setup(None)
+		self.b_id = self.g.legos.block_ids[0]
+		self.mass = p.getDynamicsInfo(self.b_id, -1)[0]
+
+	def tearDown(self):
+		"""Overloaded method of `TestCase`.
+
+		Ends the game and the pybullet session.
+		"""
+		self.g.close()
+		p.disconnect()
+
+	def pick_up(self):
+		"""Puts the block on the tower and steps until it is collected."""
+		lo, hi = p.getAABB(self.g.mobile_agent.robot, self.g.mobile_agent.tower_link)
+		p.resetBasePositionAndOrientation(self.b_id,
+		                                  [(lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2, hi[2] + .002],
+		                                  [0, 0, 0, 1])
+		for _ in range(30):
+			self.g.step()
+		self.assertEqual(self.g.legos.parked_ids, [self.b_id])
+		self.assertEqual(p.getDynamicsInfo(self.b_id, -1)[0], 0.0)
+
+	def assert_in_play(self, position):
+		"""Checks that the block is in play at about `position`."""
+		self.assertEqual(self.g.legos.parked_ids, [])
+		self.assertEqual(self.g.legos.block_ids, [self.b_id])
+		self.assertAlmostEqual(p.getDynamicsInfo(self.b_id, -1)[0], self.mass)
+		for actual, expected in zip(p.getBasePositionAndOrientation(self.b_id)[0], position):
+			self.assertAlmostEqual(actual, expected, places=3)
+
+	def test_snapshot(self):
+		"""Restoring a snapshot from before the pickup, then resetting."""
+		start = p.getBasePositionAndOrientation(self.b_id)[0]
+		for _ in range(24):
+			self.g.step()
+		position = p.getBasePositionAndOrientation(self.b_id)[0]
+		snapshot_time = self.g.save_snapshot("before")
+		self.pick_up()
+
+		self.assertEqual(self.g.restore_snapshot("before"), snapshot_time)
+		self.assert_in_play(position)
+
+		self.pick_up()
+		self.assertEqual(self.g.reset(), 0.0)
+		self.assert_in_play(start)
+
+		with self.assertRaises(KeyError):
+			self.g.restore_snapshot("missing")
+
+	def test_rewind(self):
+		"""Rewinding past the pickup, to the latest kept state that is old enough."""
+		positions = {}
+		for _ in range(24):
+			self.g.step()
+			positions[self.g.time] = p.getBasePositionAndOrientation(self.b_id)[0]
+		pickup_time = self.g.time
+		self.pick_up()
+
+		seconds = self.g.time - pickup_time + .01
+		now = self.g.time
+		rewind_time = self.g.rewind(seconds)
+		self.assertLessEqual(rewind_time, now - seconds)
+		self.assertGreater(rewind_time, now - seconds - self.g.rewind_interval - .01)
+		self.assert_in_play(positions[rewind_time])
+
+		# Nothing newer than the restored state is kept anymore
+		self.assertEqual(self.g.rewind_buffer[-1][0], rewind_time)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,94 @@
+"""
+File:			test_legos.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import unittest
+
+import pybullet as p
+
+from simulator.legos import Legos
+
+
+class LegosTest(unittest.TestCase):
+	"""A class to unit test parking collected blocks in `Legos`.
+
+	Runs a headless pybullet session with a few blocks and no field, 
+	parks blocks like `step()` does on pickup, and checks that 
+	restoring the state and resetting brings them back into play.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Loads three blocks and saves the starting state.
+		"""
+		p.connect(p.DIRECT)
+		p.setGravity(0, 0, -9.8)
+		self.legos : Legos = Legos()
+		self.legos.load_lego_urdfs([(0.0, -0.3, 0.1, "#00ffff"),
+		                            (0.1, -0.3, 0.1, "#ff0000"),
+		                            (0.2, -0.3, 0.1, "#00ff00")])
+		self.mass = p.getDynamicsInfo(self.legos.block_ids[0], -1)[0]
+		self.starting_state = p.saveState()
+
+	def tearDown(self):
+		"""Overloaded method of `TestCase`.
+
+		Ends the pybullet session.
+		"""
+		p.disconnect()
+
+	def test_park(self):
+		"""A parked block is frozen under the field and out of play."""
+		b_id = self.legos.block_ids[0]
+		self.legos.park(b_id)
+		for _ in range(60):
+			p.stepSimulation()
+
+		self.assertEqual(self.legos.parked_ids, [b_id])
+		self.assertNotIn(b_id, self.legos.block_ids)
+		self.assertNotIn(b_id, self.legos.block_id_set)
+		self.assertEqual(p.getDynamicsInfo(b_id, -1)[0], 0.0)
+		self.assertEqual(p.getBasePositionAndOrientation(b_id)[0], (0.0, 0.0, Legos.PARK_HEIGHT))
+
+	def test_reset(self):
+		"""Restoring the state and resetting puts a parked block back."""
+		b_id = self.legos.block_ids[1]
+		start_pos = p.getBasePositionAndOrientation(b_id)[0]
+		self.legos.park(b_id)
+
+		p.restoreState(self.starting_state)
+		self.legos.reset()
+
+		self.assertEqual(self.legos.parked_ids, [])
+		self.assertEqual(sorted(self.legos.block_ids), sorted(self.legos.block_id_set))
+		self.assertIn(b_id, self.legos.block_ids)
+		self.assertAlmostEqual(p.getDynamicsInfo(b_id, -1)[0], self.mass)
+		for actual, expected in zip(p.getBasePositionAndOrientation(b_id)[0], start_pos):
+			self.assertAlmostEqual(actual, expected)
+
+		# Back in play, it falls like any other block
+		for _ in range(60):
+			p.stepSimulation()
+		self.assertLess(p.getBasePositionAndOrientation(b_id)[0][2], start_pos[2])
+
+	def test_state(self):
+		"""`set_state()` parks and unparks to match `get_state()`."""
+		state = self.legos.get_state()
+		b_id = self.legos.block_ids[2]
+		self.legos.park(b_id)
+		parked_state = self.legos.get_state()
+
+		self.legos.set_state(state)
+		self.assertEqual(self.legos.get_state(), state)
+		self.assertAlmostEqual(p.getDynamicsInfo(b_id, -1)[0], self.mass)
+
+		self.legos.set_state(parked_state)
+		self.assertEqual(self.legos.get_state(), parked_state)
+		self.assertEqual(p.getDynamicsInfo(b_id, -1)[0], 0.0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,84 @@
+"""
+File:			test_scheduler.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import unittest
+
+from simulator.scheduler import Scheduler
+
+
+class SchedulerTest(unittest.TestCase):
+	"""A class to unit test `Scheduler`.
+
+	Steps a scheduler at the 240 Hz physics rate and records when, and 
+	with what time since their last run, the tasks are called.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Run before any of the unit tests.
+		"""
+		self.scheduler = Scheduler()
+		self.calls = {}
+
+	def register(self, name, period):
+		"""Registers a task that records its calls."""
+		self.calls[name] = []
+		self.scheduler.register(name, period, lambda dt: self.calls[name].append(dt))
+
+	def run_steps(self, num_steps, start=0):
+		"""Runs the scheduler for `num_steps` physics steps."""
+		for i in range(start + 1, start + num_steps + 1):
+			self.scheduler.run(i / 240)
+
+	def test_periods(self):
+		"""Every task runs at its own rate, and gets the time between runs."""
+		self.register("every_step", 0.0)
+		self.register("buttons", .01)
+		self.register("clock", .25)
+		self.run_steps(240)
+
+		# Tasks are due as soon as they are registered, so each one also 
+		#  runs on the first step
+		self.assertEqual(len(self.calls["every_step"]), 240)
+		self.assertEqual(len(self.calls["buttons"]), 101)
+		self.assertEqual(len(self.calls["clock"]), 5)
+		self.assertAlmostEqual(sum(self.calls["buttons"]), 1.0)
+		self.assertAlmostEqual(self.calls["clock"][2], .25)
+
+	def test_back_in_time(self):
+		"""Going back in time makes every task due again."""
+		self.register("clock", .25)
+		self.run_steps(120)
+		self.scheduler.run(0.0)
+		self.run_steps(1)
+
+		# Runs at 1/240, .25, and .5, then again right away at 0
+		self.assertEqual(len(self.calls["clock"]), 4)
+		self.assertEqual(self.calls["clock"][-1], 0.0)
+
+	def test_restart(self):
+		"""A restarted task waits a whole period from when it counts as run."""
+		self.register("camera", .1)
+		self.run_steps(1)
+		self.scheduler.restart("camera", .05)
+		self.run_steps(48)
+
+		# Runs at 0, then at .15 instead of .1
+		self.assertEqual(len(self.calls["camera"]), 2)
+		self.assertAlmostEqual(self.calls["camera"][-1], .1)
+
+	def test_register(self):
+		"""Names must be unique and periods not negative."""
+		self.register("clock", .25)
+		with self.assertRaises(ValueError):
+			self.register("clock", .5)
+		with self.assertRaises(ValueError):
+			self.register("backwards", -1.0)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,104 @@
+"""
+File:			test_scoring.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import random
+import unittest
+
+from simulator.buttons import Buttons
+from simulator.scoring import score_timeline
+
+
+class ScoreTimelineTest(unittest.TestCase):
+	"""A class to unit test `score_timeline()`.
+
+	Scores a few timelines by hand, then checks random ones against 
+	`Buttons` updated with small timesteps.
+	"""
+
+	def press(self, t, b, hold=.03):
+		"""Returns the events of pressing `b` at `t` for `hold` seconds."""
+		return [(t, b, True), (t + hold, b, False)]
+
+	def test_sequence_digits(self):
+		"""Presses the first digits of PI in order."""
+		events = []
+		for i, d in enumerate(map(int, Buttons.PI[:100])):
+			events += self.press(.06 * i, d)
+		score = score_timeline(events)
+
+		self.assertEqual(score.num_sequenced, 100)
+		self.assertEqual(score.extra_not_sequenced, 0)
+		self.assertTrue(score.in_sequence)
+		self.assertEqual(score.points, 1000)
+
+	def test_debounce(self):
+		"""Presses shorter than the debounce delay don't count."""
+		score = score_timeline(self.press(0.0, 3, hold=.025) + 
+		                       self.press(.1, 3, hold=.02))
+		self.assertEqual(score.num_sequenced, 0)
+
+		# Chatter restarts the delay
+		score = score_timeline([(0.0, 3, True), (.02, 3, False), (.021, 3, True), (.04, 3, False)])
+		self.assertEqual(score.num_sequenced, 0)
+
+		# A release and press at the same moment is never seen
+		score = score_timeline([(0.0, 3, True), (.02, 3, False), (.02, 3, True), (.03, 3, False)])
+		self.assertEqual(score.num_sequenced, 1)
+
+	def test_end_time(self):
+		"""Changes after `end_time` are not scored."""
+		events = self.press(0.0, 3) + self.press(.1, 1)
+		self.assertEqual(score_timeline(events, end_time=.025).num_sequenced, 0)
+		self.assertEqual(score_timeline(events, end_time=.05).num_sequenced, 1)
+		self.assertEqual(score_timeline(events).num_sequenced, 2)
+
+	def test_wrong_presses(self):
+		"""Wrong and simultaneous presses end the sequence."""
+		score = score_timeline(self.press(0.0, 3) + self.press(.1, 4) + self.press(.2, 1))
+		self.assertEqual(tuple(score), (1, 2, False))
+
+		# 3 is sequenced before 4 is debounced, then both are pressed
+		score = score_timeline(self.press(0.0, 3) + self.press(.01, 4))
+		self.assertEqual(tuple(score), (1, 0, False))
+
+		with self.assertRaises(IndexError):
+			score_timeline([(0.0, 10, True)])
+
+	def test_matches_buttons(self):
+		"""Random timelines score the same as with `Buttons`.
+
+		Event times are whole milliseconds, and `Buttons` is updated 
+		every millisecond.
+		"""
+		rng = random.Random(0)
+		for _ in range(20):
+			events = []
+			t = 0
+			for i in range(10):
+				b = int(Buttons.PI[i]) if rng.random() < .7 else rng.randrange(10)
+				t += rng.choice([5, 10, 20, 25, 30])
+				hold = rng.choice([10, 25, 30, 40])
+				events += self.press(t / 1000, b, hold / 1000)
+				if rng.random() < .2:
+					events += self.press((t + 5) / 1000, rng.randrange(10), .03)
+				t += hold
+
+			bs = Buttons()
+			positions = [0.0] * 10
+			events.sort(key=lambda e: e[0])
+			i = 0
+			for step in range(1, t + 100):
+				while i < len(events) and round(events[i][0] * 1000) <= step:
+					positions[events[i][1]] = -1.0 if events[i][2] else 0.0
+					i += 1
+				bs.apply_readings(positions, -.5, .001)
+
+			self.assertEqual(tuple(score_timeline(events)),
+			                 (bs.num_sequenced, bs.extra_not_sequenced, bs.in_sequence))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,215 @@
+"""
+File:			test_sim.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import threading
+import unittest
+
+import numpy as np
+import pybullet as p
+
+import sim
+from simulator.camera import CameraConfig
+from simulator.game import Game
+
+
+class ActTest(unittest.TestCase):
+	"""A class to unit test the fused `SRACT` command on the server side.
+
+	Drives a headless game once through `_act()` and once like 
+	`command_robot_vels()` followed by stepping, and checks that both 
+	move the robot the same way.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Sets up a headless game with the robot enabled.
+		"""
+		self.g : Game = Game(use_interactive=False, is_interactive_realtime=False)
+		self.g.setup(None)
+
+	def tearDown(self):
+		"""Overloaded method of `TestCase`.
+
+		Ends the game and the pybullet session.
+		"""
+		self.g.close()
+		p.disconnect()
+
+	def yaw(self):
+		"""The robot's heading in radians."""
+		_, orientation = p.getBasePositionAndOrientation(self.g.mobile_agent.robot)
+		return p.getEulerFromQuaternion(orientation)[2]
+
+	def turn(self, command):
+		"""Resets, drives the robot with `command`, and returns its turn."""
+		self.g.reset()
+		self.g.mobile_agent.enabled = True
+		start = self.yaw()
+		command()
+		return self.yaw() - start
+
+	def test_same_turn(self):
+		"""`act()` turns the robot like `command_robot_vels()` and `step()`."""
+		def command_and_step():
+			sim._handle_request(self.g, None, (sim.SRWHEELS, 3.0, 0.0))
+			for _ in range(120):
+				self.g.step()
+
+		act_turn = self.turn(lambda: sim._act(self.g, 3.0, 0.0, 120, False))
+		command_turn = self.turn(command_and_step)
+		self.assertGreater(abs(command_turn), .1)
+		# A restored state doesn't replay exactly, but the wrong wheels turn 
+		#  the other way
+		self.assertAlmostEqual(act_turn, command_turn, delta=.05)
+
+
+class ParseStepTest(unittest.TestCase):
+	"""A class to unit test how `SRSTEP` requests are unpacked."""
+
+	def test_forms(self):
+		"""The older two-element form neither waits nor observes."""
+		self.assertEqual(sim._parse_step((sim.SRSTEP, 10)), (10, False, False))
+		self.assertEqual(sim._parse_step((sim.SRSTEP, 10, True, False)), (10, True, False))
+
+	def test_invalid(self):
+		"""Step counts must be non-negative integers."""
+		for req_token in [(sim.SRSTEP, 2.5, True, False), (sim.SRSTEP, -1),
+		                  (sim.SRSTEP, "10"), (sim.SRSTEP,), (sim.SRSTEP, 1, True)]:
+			with self.assertRaises(ValueError):
+				sim._parse_step(req_token)
+
+
+def start_headless():
+	"""Starts a headless sim server with manual timestepping and a tiny camera."""
+	config = sim.SimConfig(None)
+	config.use_interactive = False
+	config.is_interactive_realtime = False
+	config.camera_config = CameraConfig(width=32, height=32, renderer=p.ER_TINY_RENDERER)
+	return sim.SimHandle(config).start()
+
+
+class SimHandleTest(unittest.TestCase):
+	"""A class to unit test a `SimHandle` and its sim server.
+
+	Shares one headless server between the tests, and checks requests 
+	and responses, errors coming back from the server, and frames passed 
+	through the shared memory ring.
+	"""
+
+	@classmethod
+	def setUpClass(cls):
+		"""Overloaded method of `TestCase`.
+
+		Starts the server once for every test.
+		"""
+		cls.h : sim.SimHandle = start_headless()
+
+	@classmethod
+	def tearDownClass(cls):
+		"""Overloaded method of `TestCase`.
+
+		Ends the server.
+		"""
+		cls.h.end(timeout=10)
+
+	def test_out_of_order(self):
+		"""Each response goes to its own request, in whatever order they finish."""
+		start = self.h.step(0, wait=True, timeout=10)
+		result = {}
+		stepper = threading.Thread(
+			target=lambda: result.update(time=self.h.step(240, wait=True, timeout=10)))
+		stepper.start()
+		# Answered while the steps still run
+		self.assertLess(self.h.get_time(timeout=10), start + 1.0)
+		stepper.join()
+		self.assertAlmostEqual(result["time"], start + 1.0)
+
+	def test_timeout(self):
+		"""A slow response times out, and doesn't confuse later requests."""
+		with self.assertRaises(TimeoutError):
+			self.h.step(2400, wait=True, timeout=.01)
+		# Stop the steps that are still running
+		self.h.step(0, wait=True, timeout=10)
+		self.assertEqual(self.h.set_time(5.0, timeout=10), 5.0)
+
+	def test_server_error(self):
+		"""Errors in the server are raised by the client, which carries on."""
+		with self.assertRaises(KeyError):
+			self.h.restore_snapshot("missing", timeout=10)
+		with self.assertRaises(ValueError):
+			self.h.step(2.5, wait=True, timeout=10)
+		self.assertTrue(self.h.request((sim.SRSTEP, 10), timeout=10))
+		self.assertTrue(self.h.process.is_alive())
+
+	def test_step(self):
+		"""Waiting and observing steps reply once the steps are done."""
+		start = self.h.step(0, wait=True, timeout=10)
+		self.assertAlmostEqual(self.h.step(24, wait=True, timeout=10), start + .1)
+		observation = self.h.step(24, observe=True, timeout=10)
+		self.assertIsInstance(observation, sim.Observation)
+		self.assertAlmostEqual(observation.time, start + .2)
+		self.assertEqual(len(observation.wheel_vels), 2)
+
+	def test_act(self):
+		"""One round trip commands, steps, and observes the camera."""
+		start = self.h.step(0, wait=True, timeout=10)
+		observation = self.h.act(1.0, 1.0, num_steps=12, with_image=True, timeout=10)
+		self.assertAlmostEqual(observation.time, start + .05)
+		self.assertEqual(observation.image.shape, (32, 32, 4))
+		self.assertEqual(observation.image.dtype, np.uint8)
+
+	def test_frames(self):
+		"""Camera frames and stereo pairs are unpacked from the ring."""
+		first = self.h.read_robot_cam_frame(timeout=10)
+		second = self.h.read_robot_cam_frame(timeout=10)
+		self.assertEqual(second.seq, first.seq + 1)
+		self.assertEqual(second.image.shape, (32, 32, 4))
+		self.assertTrue(second.image.any())
+
+		stereo = self.h.read_robot_stereo(depth=True, timeout=10)
+		self.assertEqual(stereo.left.shape, (32, 32, 4))
+		self.assertEqual(stereo.right.shape, (32, 32, 4))
+		self.assertEqual(stereo.left_depth.shape, (32, 32))
+		self.assertEqual(stereo.left_depth.dtype, np.float32)
+		self.assertTrue((stereo.right_depth > 0.0).all())
+
+
+class SimHandleEndTest(unittest.TestCase):
+	"""A class to unit test a `SimHandle` once its server is gone."""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Starts a server for the test to end.
+		"""
+		self.h : sim.SimHandle = start_headless()
+
+	def tearDown(self):
+		"""Overloaded method of `TestCase`.
+
+		Frees the frame ring, unless ending the server already did.
+		"""
+		if self.h.frames.frames is not None:
+			self.h.frames.close()
+
+	def test_after_end(self):
+		"""Requests to a server that has ended fail right away."""
+		self.assertTrue(self.h.end(timeout=10))
+		with self.assertRaises(RuntimeError):
+			self.h.get_time(timeout=10)
+
+	def test_server_died(self):
+		"""Requests waiting on a server that died fail instead of hanging."""
+		self.h.step(1, wait=True, timeout=10)
+		self.h.process.terminate()
+		self.h.process.join()
+		with self.assertRaises(RuntimeError):
+			self.h.step(24, wait=True, timeout=10)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,70 @@
+"""
+File:			test_state_logger.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import pybullet as p
+
+from simulator.state_logger import StateLogger
+
+
+class StateLoggerTest(unittest.TestCase):
+	"""A class to unit test `StateLogger`.
+
+	Logs the states of an empty headless pybullet session into a 
+	temporary directory, including when that directory goes away.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Starts a headless session and a logger in an empty directory.
+		"""
+		p.connect(p.DIRECT)
+		self.dir = tempfile.TemporaryDirectory()
+		self.log_dir = os.path.join(self.dir.name, "states")
+		self.logger : StateLogger = StateLogger(self.log_dir)
+
+	def tearDown(self):
+		"""Overloaded method of `TestCase`.
+
+		Ends the session and removes the directory.
+		"""
+		p.disconnect()
+		self.dir.cleanup()
+
+	def test_log(self):
+		"""Logged states end up in the log directory."""
+		self.assertTrue(self.logger.log("a.bullet"))
+		self.logger.close()
+		self.assertEqual(os.listdir(self.log_dir), ["a.bullet"])
+
+	def test_failed_write(self):
+		"""A state that can't be written is reported, and later ones still are."""
+		shutil.rmtree(self.log_dir)
+		# Stands in for the log directory having become unwritable
+		open(self.log_dir, "w").close()
+		stderr = io.StringIO()
+		with contextlib.redirect_stderr(stderr):
+			self.logger.log("a.bullet")
+			self.logger.pending.join()
+			os.remove(self.log_dir)
+			os.makedirs(self.log_dir)
+			self.logger.log("b.bullet")
+			self.logger.close()
+
+		self.assertEqual(self.logger.num_failed, 1)
+		self.assertEqual(os.listdir(self.log_dir), ["b.bullet"])
+		self.assertIn("1 failed", stderr.getvalue())
+
+
+if __name__ == "__main__":
+	unittest.main()
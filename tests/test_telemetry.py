@@ -0,0 +1,97 @@
+"""
+File:			test_telemetry.py
+Author:			Binit Shah
+Last Modified:	Binit on 10/18
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from simulator.telemetry import TelemetryRecorder
+
+
+class TelemetryRecorderTest(unittest.TestCase):
+	"""A class to unit test `TelemetryRecorder`.
+
+	Records rows with a small chunk size so the tests cover full chunks,
+	partial chunks, and what the file holds in between.
+	"""
+
+	def setUp(self):
+		"""Overloaded method of `TestCase`.
+
+		Starts every test with an empty directory.
+		"""
+		self.dir = tempfile.TemporaryDirectory()
+		self.fname = os.path.join(self.dir.name, "telemetry.npy")
+
+	def tearDown(self):
+		"""Overloaded method of `TestCase`.
+
+		Removes the directory.
+		"""
+		self.dir.cleanup()
+
+	def record(self, recorder, i):
+		"""Records a row whose values are all derived from `i`."""
+		recorder.record(i / 240, (i, i + 1, i + 2), (0, 0, 0, 1),
+		                (i, -i), (2 * i, -2 * i), i % 2 == 0, i // 10)
+
+	def test_rows(self):
+		"""Every recorded row comes back in order with its values."""
+		recorder = TelemetryRecorder(self.fname, chunk_size=4)
+		for i in range(10):
+			self.record(recorder, i)
+		recorder.close()
+
+		trace = np.load(self.fname, mmap_mode="r")
+		self.assertEqual(len(trace), 10)
+		np.testing.assert_allclose(trace["time"], np.arange(10) / 240)
+		np.testing.assert_allclose(trace["position"][:, 1], np.arange(10) + 1)
+		np.testing.assert_allclose(trace["orientation"][3], (0, 0, 0, 1))
+		np.testing.assert_allclose(trace["wheel_vels"][:, 1], -np.arange(10))
+		np.testing.assert_allclose(trace["target_vels"][:, 0], 2 * np.arange(10))
+		self.assertEqual(list(trace["enabled"]), [i % 2 == 0 for i in range(10)])
+		self.assertEqual(list(trace["legos"]), [i // 10 for i in range(10)])
+
+	def test_flushed_chunks(self):
+		"""The file is loadable before close, with every full chunk in it."""
+		recorder = TelemetryRecorder(self.fname, chunk_size=4)
+		for i in range(6):
+			self.record(recorder, i)
+		self.assertEqual(len(np.load(self.fname)), 4)
+		recorder.close()
+		self.assertEqual(len(np.load(self.fname)), 6)
+
+	def test_header_size(self):
+		"""The header doesn't grow with the number of rows, which stay in place."""
+		recorder = TelemetryRecorder(self.fname, chunk_size=1)
+		self.record(recorder, 0)
+		with open(self.fname, "rb") as f:
+			np.lib.format.read_magic(f)
+			np.lib.format.read_array_header_1_0(f)
+			offset = f.tell()
+
+		recorder.num_rows = 10**15
+		recorder._write_header()
+		with open(self.fname, "rb") as f:
+			np.lib.format.read_magic(f)
+			shape, _, _ = np.lib.format.read_array_header_1_0(f)
+			self.assertEqual(shape, (10**15,))
+			self.assertEqual(f.tell(), offset)
+		recorder.num_rows = 1
+		recorder._write_header()
+		recorder.close()
+		self.assertAlmostEqual(np.load(self.fname)["position"][0, 2], 2.0)
+
+	def test_empty(self):
+		"""Closing without recording leaves an empty trace."""
+		TelemetryRecorder(self.fname).close()
+		self.assertEqual(len(np.load(self.fname)), 0)
+
+
+if __name__ == "__main__":
+	unittest.main()